@@ -6,18 +6,24 @@ Uses OpenStreetMap Nominatim for geocoding and Open-Elevation API for altitude.
 
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional, Dict, Any, List, Tuple, Mapping, NamedTuple
 import httpx
 import asyncio
+import time
 from datetime import datetime, timedelta
 from functools import lru_cache
-import hashlib
+from types import MappingProxyType
+import unicodedata
+import json
+import os
 
 app = FastAPI(
     title="PV Optimizer Geo Service",
     description="Geocoding and elevation resolution for PV installations",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS
@@ -36,14 +42,17 @@ app.add_middleware(
 # In-memory cache with TTL (Time To Live)
 # TODO: Replace with Redis for production
 class GeoCache:
-    def __init__(self, ttl_hours: int = 24 * 7):  # 7 days default
-        self._cache: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, ttl_hours: int = 24 * 7, miss_ttl_minutes: int = 15, max_misses: int = 1024):  # 7 days default
+        self._cache: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
         self._ttl = timedelta(hours=ttl_hours)
+        # Negative cache: locations Nominatim could not resolve (short TTL, bounded size)
+        self._misses: Dict[Tuple[str, str, str], datetime] = {}
+        self._miss_ttl = timedelta(minutes=miss_ttl_minutes)
+        self._max_misses = max_misses
 
-    def _make_key(self, country: str, postal_code: str, city: str) -> str:
+    def _make_key(self, country: str, postal_code: str, city: str) -> Tuple[str, str, str]:
         """Create cache key from location components."""
-        raw = f"{country.upper()}:{postal_code}:{city.lower()}"
-        return hashlib.md5(raw.encode()).hexdigest()
+        return normalize_location_key(country, postal_code, city)
 
     def get(self, country: str, postal_code: str, city: str) -> Optional[Dict]:
         """Get cached result if valid."""
@@ -65,6 +74,27 @@ class GeoCache:
             'created': datetime.now().isoformat()
         }
 
+    def is_miss(self, country: str, postal_code: str, city: str) -> bool:
+        """Check if location was recently reported as not found."""
+        key = self._make_key(country, postal_code, city)
+        expires = self._misses.get(key)
+        if expires is None:
+            return False
+        if datetime.now() < expires:
+            return True
+        del self._misses[key]
+        return False
+
+    def set_miss(self, country: str, postal_code: str, city: str):
+        """Remember that location could not be resolved (short TTL)."""
+        key = self._make_key(country, postal_code, city)
+        now = datetime.now()
+        # Drop expired misses, then the oldest ones if still full
+        self._misses = {k: e for k, e in self._misses.items() if now < e and k != key}
+        while len(self._misses) >= self._max_misses:
+            del self._misses[next(iter(self._misses))]
+        self._misses[key] = now + self._miss_ttl
+
     def stats(self) -> Dict:
         """Return cache statistics."""
         now = datetime.now()
@@ -72,15 +102,138 @@ class GeoCache:
         return {
             'total_entries': len(self._cache),
             'valid_entries': valid,
-            'expired_entries': len(self._cache) - valid
+            'expired_entries': len(self._cache) - valid,
+            'negative_entries': sum(1 for e in self._misses.values() if now < e)
         }
 
     def clear(self):
         """Clear all cache entries."""
         self._cache.clear()
+        self._misses.clear()
+
+    def save(self, path: str) -> int:
+        """Write valid entries to a JSON snapshot. Returns number of entries saved."""
+        now = datetime.now()
+        entries = [
+            {
+                'key': list(key),
+                'data': entry['data'],
+                'expires': entry['expires'].isoformat(),
+                'created': entry['created']
+            }
+            for key, entry in self._cache.items()
+            if now < entry['expires']
+        ]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return len(entries)
+
+    def load(self, path: str) -> int:
+        """Load non-expired entries from a JSON snapshot. Returns number of entries loaded."""
+        if not os.path.exists(path):
+            return 0
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+        now = datetime.now()
+        loaded = 0
+        for item in entries:
+            expires = datetime.fromisoformat(item['expires'])
+            if now < expires:
+                # Snapshot is plain JSON - only keep entries that are still valid locations
+                try:
+                    data = GeoLocation(**item['data']).model_dump(exclude={"cached"})
+                except (ValidationError, TypeError):
+                    continue
+                self._cache[tuple(item['key'])] = {
+                    'data': data,
+                    'expires': expires,
+                    'created': item['created']
+                }
+                loaded += 1
+        return loaded
 
 geo_cache = GeoCache()
 
+# Cache snapshot - hot locations survive restarts without re-querying Nominatim
+GEO_CACHE_FILE = os.environ.get("GEO_CACHE_FILE", "/app/data/geo_cache.json")
+
+@app.on_event("startup")
+async def load_geo_cache():
+    """Warm cache from snapshot written on last shutdown."""
+    try:
+        loaded = geo_cache.load(GEO_CACHE_FILE)
+        print(f"Geo cache: loaded {loaded} entries from {GEO_CACHE_FILE}")
+    except Exception as e:
+        print(f"Geo cache load error: {e}")
+
+@app.on_event("shutdown")
+async def save_geo_cache():
+    """Persist cache snapshot for next startup."""
+    try:
+        saved = geo_cache.save(GEO_CACHE_FILE)
+        print(f"Geo cache: saved {saved} entries to {GEO_CACHE_FILE}")
+    except Exception as e:
+        print(f"Geo cache save error: {e}")
+
+# ============================================
+# RATE LIMITING
+# ============================================
+
+class AsyncRateLimiter:
+    """
+    Serializes calls so that consecutive acquisitions are at least
+    `min_interval` seconds apart. Only wraps real upstream requests -
+    cache hits never touch the limiter.
+    """
+    def __init__(self, min_interval: float):
+        self._min_interval = min_interval
+        self._lock = asyncio.Lock()
+        self._last_call = 0.0
+
+    async def __aenter__(self):
+        await self._lock.acquire()
+        try:
+            wait = self._last_call + self._min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._lock.release()
+            raise
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._last_call = time.monotonic()
+        self._lock.release()
+
+# Nominatim usage policy: max 1 request per second
+NOMINATIM_LIMITER = AsyncRateLimiter(1.1)
+
+# ============================================
+# HTTP CLIENT
+# ============================================
+
+# Shared client - keeps connections to Nominatim / Open-Elevation alive
+# between requests instead of paying TCP+TLS handshake on every call
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return shared HTTP client (created lazily on first use)."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=4)
+        )
+    return _http_client
+
+@app.on_event("shutdown")
+async def close_http_client():
+    """Close shared HTTP client on shutdown."""
+    if _http_client is not None:
+        await _http_client.aclose()
+
 # ============================================
 # MODELS
 # ============================================
@@ -119,6 +272,51 @@ def format_polish_postal_code(postal_code: str) -> str:
     return postal_code
 
 
+@lru_cache(maxsize=8192)
+def normalize_city_name(city: str) -> str:
+    """Normalize city name for lookups (NFKC, trimmed, case-folded)."""
+    if not city:
+        return ""
+    return unicodedata.normalize("NFKC", city).strip().casefold()
+
+
+@lru_cache(maxsize=8192)
+def normalize_location_key(country: str, postal_code: str, city: str) -> Tuple[str, str, str]:
+    """
+    Normalize location components into a canonical cache key.
+    "Warszawa", " warszawa " and "WARSZAWA" all map to the same entry,
+    as do "00001" and "00-001" for Polish postal codes.
+    """
+    country = country.strip().upper()
+    postal_code = postal_code.strip()
+    if country == "PL" and postal_code:
+        postal_code = format_polish_postal_code(postal_code)
+    return (country, postal_code, normalize_city_name(city))
+
+
+def with_request_names(
+    data: Dict[str, Any],
+    postal_code: Optional[str],
+    city: Optional[str],
+    country: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Echo this request's country / postal code / city in a cached result.
+    Inputs that normalize to the same key share one cache entry, which holds
+    the spelling of whoever resolved it first.
+    """
+    if data.get("source") == "postal_database":
+        # Names come from the regional table, not from the request
+        return data
+    data = {**data, "postal_code": postal_code, "city": city}
+    if data.get("source") == "preloaded":
+        data["display_name"] = f"{city}, Polska"
+    elif country is not None:
+        # Nominatim results echo the requested country code as given
+        data["country"] = country
+    return data
+
+
 async def geocode_nominatim(country: str, postal_code: str = None, city: str = None) -> Optional[Dict]:
     """
     Geocode using OpenStreetMap Nominatim API.
@@ -147,83 +345,151 @@ async def geocode_nominatim(country: str, postal_code: str = None, city: str = N
     if city:
         params["city"] = city
 
-    async with httpx.AsyncClient() as client:
-        try:
+    client = get_http_client()
+    try:
+        async with NOMINATIM_LIMITER:
             response = await client.get(url, params=params, headers=headers, timeout=10.0)
-            response.raise_for_status()
-            results = response.json()
-
-            if results and len(results) > 0:
-                result = results[0]
-                return {
-                    "latitude": float(result["lat"]),
-                    "longitude": float(result["lon"]),
-                    "display_name": result.get("display_name", ""),
-                    "address": result.get("address", {})
-                }
-
-            # Fallback: try free-form query if structured didn't work
-            query_parts = []
-            if postal_code:
-                query_parts.append(postal_code)
-            if city:
-                query_parts.append(city)
-            query_parts.append(country)
-
-            params_fallback = {
-                "q": ", ".join(query_parts),
-                "format": "json",
-                "limit": 1,
-                "addressdetails": 1
+        response.raise_for_status()
+        results = response.json()
+
+        if results and len(results) > 0:
+            result = results[0]
+            return {
+                "latitude": float(result["lat"]),
+                "longitude": float(result["lon"]),
+                "display_name": result.get("display_name", ""),
+                "address": result.get("address", {})
             }
 
+        # Fallback: try free-form query if structured didn't work
+        query_parts = []
+        if postal_code:
+            query_parts.append(postal_code)
+        if city:
+            query_parts.append(city)
+        query_parts.append(country)
+
+        params_fallback = {
+            "q": ", ".join(query_parts),
+            "format": "json",
+            "limit": 1,
+            "addressdetails": 1
+        }
+
+        async with NOMINATIM_LIMITER:
             response = await client.get(url, params=params_fallback, headers=headers, timeout=10.0)
-            response.raise_for_status()
-            results = response.json()
-
-            if results and len(results) > 0:
-                result = results[0]
-                return {
-                    "latitude": float(result["lat"]),
-                    "longitude": float(result["lon"]),
-                    "display_name": result.get("display_name", ""),
-                    "address": result.get("address", {})
-                }
-        except Exception as e:
-            print(f"Nominatim geocoding error: {e}")
+        response.raise_for_status()
+        results = response.json()
+
+        if results and len(results) > 0:
+            result = results[0]
+            return {
+                "latitude": float(result["lat"]),
+                "longitude": float(result["lon"]),
+                "display_name": result.get("display_name", ""),
+                "address": result.get("address", {})
+            }
+
+        # Both queries answered with no results - remember the miss
+        # (network/API errors are not cached)
+        geo_cache.set_miss(country, postal_code or "", city or "")
+    except Exception as e:
+        print(f"Nominatim geocoding error: {e}")
 
     return None
 
+# Elevation memo keyed by coordinates rounded to 4 decimals (~11 m),
+# at which elevation is effectively constant. Oldest entries are evicted first.
+ELEVATION_CACHE_SIZE = 4096
+_elevation_cache: Dict[Tuple[float, float], float] = {}
+
+def _remember_elevation(key: Tuple[float, float], elevation: float):
+    """Store elevation in memo, evicting the oldest entry when full."""
+    if len(_elevation_cache) >= ELEVATION_CACHE_SIZE:
+        del _elevation_cache[next(iter(_elevation_cache))]
+    _elevation_cache[key] = elevation
+
 async def get_elevation(lat: float, lon: float) -> Optional[float]:
     """
     Get elevation using Open-Elevation API.
     Free, no API key required.
     """
+    key = (round(lat, 4), round(lon, 4))
+    if key in _elevation_cache:
+        return _elevation_cache[key]
+
     url = "https://api.open-elevation.com/api/v1/lookup"
-    params = {"locations": f"{lat},{lon}"}
+    params = {"locations": f"{key[0]},{key[1]}"}
+
+    client = get_http_client()
+    try:
+        response = await client.get(url, params=params, timeout=10.0)
+        response.raise_for_status()
+        data = response.json()
+
+        if data.get("results") and len(data["results"]) > 0:
+            elevation = data["results"][0].get("elevation")
+            if elevation is not None:
+                _remember_elevation(key, elevation)
+            return elevation
+    except Exception as e:
+        print(f"Elevation API error: {e}")
+
+    return None
+
+async def get_elevations_batch(points: List[Tuple[float, float]]) -> List[Optional[float]]:
+    """
+    Get elevations for many points with a single Open-Elevation POST.
+    Duplicate and already memoized coordinates are not re-requested.
+    """
+    keys = [(round(lat, 4), round(lon, 4)) for lat, lon in points]
+    missing = list(dict.fromkeys(k for k in keys if k not in _elevation_cache))
+
+    if missing:
+        url = "https://api.open-elevation.com/api/v1/lookup"
+        payload = {"locations": [{"latitude": lat, "longitude": lon} for lat, lon in missing]}
 
-    async with httpx.AsyncClient() as client:
+        client = get_http_client()
         try:
-            response = await client.get(url, params=params, timeout=10.0)
+            response = await client.post(url, json=payload, timeout=10.0)
             response.raise_for_status()
             data = response.json()
 
-            if data.get("results") and len(data["results"]) > 0:
-                return data["results"][0].get("elevation")
+            for key, item in zip(missing, data.get("results") or [], strict=False):
+                elevation = item.get("elevation")
+                if elevation is not None:
+                    _remember_elevation(key, elevation)
         except Exception as e:
-            print(f"Elevation API error: {e}")
+            print(f"Elevation API error (batch): {e}")
 
-    return None
+    return [_elevation_cache.get(k) for k in keys]
 
-async def resolve_location(country: str, postal_code: str = None, city: str = None) -> Optional[GeoLocation]:
+async def resolve_location(
+    country: str,
+    postal_code: str = None,
+    city: str = None,
+    fetch_elevation: bool = True,
+    use_cache: bool = True
+) -> Optional[GeoLocation]:
     """
     Resolve location to coordinates and elevation.
     Uses cache if available.
+
+    With use_cache=False a recent Nominatim miss does not short-circuit the
+    lookup - Nominatim is asked again.
+
+    With fetch_elevation=False a freshly geocoded result is returned without
+    elevation and is NOT cached - the caller fills elevation in (e.g. from
+    get_elevations_batch) and caches it.
     """
     # Check cache first
     cached = geo_cache.get(country, postal_code or "", city or "")
     if cached:
-        return GeoLocation(**cached, cached=True)
+        return GeoLocation(**with_request_names(cached, postal_code, city, country), cached=True)
+
+    # Skip Nominatim for locations it recently failed to find
+    if use_cache and geo_cache.is_miss(country, postal_code or "", city or ""):
+        return None
 
     # Geocode
     geo_result = await geocode_nominatim(country, postal_code, city)
@@ -234,7 +500,7 @@ async def resolve_location(country: str, postal_code: str = None, city: str = No
     lon = geo_result["longitude"]
 
     # Get elevation (separate call)
-    elevation = await get_elevation(lat, lon)
+    elevation = await get_elevation(lat, lon) if fetch_elevation else None
 
     # Build result
     result = {
@@ -249,7 +515,8 @@ async def resolve_location(country: str, postal_code: str = None, city: str = No
     }
 
     # Cache result
-    geo_cache.set(country, postal_code or "", city or "", result)
+    if fetch_elevation:
+        geo_cache.set(country, postal_code or "", city or "", result)
 
     return GeoLocation(**result, cached=False)
 
@@ -257,115 +524,144 @@ async def resolve_location(country: str, postal_code: str = None, city: str = No
 # POLISH CITY DATABASE (Preloaded)
 # ============================================
 
+class PostalRegion(NamedTuple):
+    """Approximate centre of a Polish postal region."""
+    lat: float
+    lon: float
+    city: str
+    elev: int
+
+
+class CityRecord(NamedTuple):
+    """Preloaded coordinates of a Polish city."""
+    lat: float
+    lon: float
+    elev: int
+
+
 # Polish postal code prefixes to approximate locations
 # Format: first 2 digits -> region center coordinates
-POLISH_POSTAL_REGIONS = {
-    "00": {"lat": 52.23, "lon": 21.01, "city": "Warszawa", "elev": 100},
-    "01": {"lat": 52.23, "lon": 21.01, "city": "Warszawa", "elev": 100},
-    "02": {"lat": 52.19, "lon": 21.00, "city": "Warszawa", "elev": 100},
-    "03": {"lat": 52.27, "lon": 21.04, "city": "Warszawa", "elev": 100},
-    "04": {"lat": 52.21, "lon": 21.09, "city": "Warszawa", "elev": 100},
-    "05": {"lat": 52.20, "lon": 20.85, "city": "Pruszków", "elev": 95},
-    "06": {"lat": 52.82, "lon": 20.15, "city": "Płock", "elev": 60},
-    "07": {"lat": 52.66, "lon": 21.55, "city": "Wyszków", "elev": 95},
-    "08": {"lat": 52.17, "lon": 22.29, "city": "Siedlce", "elev": 150},
-    "09": {"lat": 52.41, "lon": 20.31, "city": "Sochaczew", "elev": 70},
-    "10": {"lat": 53.78, "lon": 20.48, "city": "Olsztyn", "elev": 130},
-    "11": {"lat": 53.85, "lon": 20.02, "city": "Ostróda", "elev": 100},
-    "12": {"lat": 53.25, "lon": 20.49, "city": "Szczytno", "elev": 140},
-    "13": {"lat": 53.48, "lon": 19.70, "city": "Iława", "elev": 110},
-    "14": {"lat": 54.02, "lon": 21.75, "city": "Ełk", "elev": 130},
-    "15": {"lat": 53.13, "lon": 23.16, "city": "Białystok", "elev": 150},
-    "16": {"lat": 53.44, "lon": 23.87, "city": "Augustów", "elev": 120},
-    "17": {"lat": 52.72, "lon": 23.18, "city": "Bielsk Podlaski", "elev": 145},
-    "18": {"lat": 53.74, "lon": 22.36, "city": "Grajewo", "elev": 125},
-    "19": {"lat": 52.84, "lon": 22.32, "city": "Zambrów", "elev": 140},
-    "20": {"lat": 51.25, "lon": 22.57, "city": "Lublin", "elev": 200},
-    "21": {"lat": 51.22, "lon": 22.97, "city": "Świdnik", "elev": 190},
-    "22": {"lat": 50.87, "lon": 23.86, "city": "Zamość", "elev": 220},
-    "23": {"lat": 50.82, "lon": 22.77, "city": "Biłgoraj", "elev": 210},
-    "24": {"lat": 51.52, "lon": 21.96, "city": "Puławy", "elev": 120},
-    "25": {"lat": 50.87, "lon": 20.63, "city": "Kielce", "elev": 260},
-    "26": {"lat": 51.39, "lon": 20.65, "city": "Radom", "elev": 180},
-    "27": {"lat": 50.90, "lon": 21.40, "city": "Starachowice", "elev": 240},
-    "28": {"lat": 50.56, "lon": 20.44, "city": "Jędrzejów", "elev": 275},
-    "29": {"lat": 51.21, "lon": 21.45, "city": "Skarżysko-Kam.", "elev": 250},
-    "30": {"lat": 50.06, "lon": 19.94, "city": "Kraków", "elev": 220},
-    "31": {"lat": 50.08, "lon": 19.90, "city": "Kraków", "elev": 220},
-    "32": {"lat": 50.05, "lon": 19.88, "city": "Kraków", "elev": 220},
-    "33": {"lat": 49.88, "lon": 19.49, "city": "Myślenice", "elev": 310},
-    "34": {"lat": 49.99, "lon": 20.42, "city": "Bochnia", "elev": 210},
-    "35": {"lat": 50.04, "lon": 21.99, "city": "Rzeszów", "elev": 220},
-    "36": {"lat": 50.26, "lon": 22.72, "city": "Stalowa Wola", "elev": 165},
-    "37": {"lat": 49.78, "lon": 22.76, "city": "Przemyśl", "elev": 250},
-    "38": {"lat": 49.49, "lon": 20.68, "city": "Nowy Sącz", "elev": 290},
-    "39": {"lat": 50.30, "lon": 22.16, "city": "Tarnobrzeg", "elev": 150},
-    "40": {"lat": 50.26, "lon": 19.02, "city": "Katowice", "elev": 280},
-    "41": {"lat": 50.30, "lon": 18.93, "city": "Zabrze", "elev": 265},
-    "42": {"lat": 50.21, "lon": 19.08, "city": "Tychy", "elev": 245},
-    "43": {"lat": 49.94, "lon": 19.21, "city": "Bielsko-Biała", "elev": 330},
-    "44": {"lat": 50.30, "lon": 18.67, "city": "Gliwice", "elev": 230},
-    "45": {"lat": 50.67, "lon": 17.92, "city": "Opole", "elev": 155},
-    "46": {"lat": 50.27, "lon": 17.38, "city": "Nysa", "elev": 195},
-    "47": {"lat": 50.64, "lon": 18.28, "city": "Strzelce Opolskie", "elev": 200},
-    "48": {"lat": 50.01, "lon": 17.87, "city": "Racibórz", "elev": 200},
-    "49": {"lat": 50.46, "lon": 18.16, "city": "Tarnowskie Góry", "elev": 295},
-    "50": {"lat": 51.11, "lon": 17.04, "city": "Wrocław", "elev": 120},
-    "51": {"lat": 51.08, "lon": 17.08, "city": "Wrocław", "elev": 120},
-    "52": {"lat": 51.12, "lon": 16.98, "city": "Wrocław", "elev": 115},
-    "53": {"lat": 51.14, "lon": 17.02, "city": "Wrocław", "elev": 115},
-    "54": {"lat": 51.15, "lon": 16.93, "city": "Wrocław", "elev": 115},
-    "55": {"lat": 51.29, "lon": 16.90, "city": "Oborniki Śląskie", "elev": 135},
-    "56": {"lat": 51.45, "lon": 16.28, "city": "Głogów", "elev": 80},
-    "57": {"lat": 50.78, "lon": 16.28, "city": "Kłodzko", "elev": 320},
-    "58": {"lat": 50.90, "lon": 15.72, "city": "Jelenia Góra", "elev": 350},
-    "59": {"lat": 51.10, "lon": 16.15, "city": "Legnica", "elev": 115},
-    "60": {"lat": 52.41, "lon": 16.93, "city": "Poznań", "elev": 60},
-    "61": {"lat": 52.40, "lon": 16.87, "city": "Poznań", "elev": 65},
-    "62": {"lat": 52.17, "lon": 17.08, "city": "Swarzędz", "elev": 75},
-    "63": {"lat": 51.73, "lon": 17.47, "city": "Kalisz", "elev": 105},
-    "64": {"lat": 52.01, "lon": 16.07, "city": "Leszno", "elev": 90},
-    "65": {"lat": 51.94, "lon": 15.51, "city": "Zielona Góra", "elev": 80},
-    "66": {"lat": 52.31, "lon": 14.55, "city": "Słubice", "elev": 20},
-    "67": {"lat": 51.72, "lon": 14.99, "city": "Żary", "elev": 110},
-    "68": {"lat": 52.11, "lon": 14.84, "city": "Świebodzin", "elev": 55},
-    "69": {"lat": 51.60, "lon": 15.78, "city": "Żagań", "elev": 105},
-    "70": {"lat": 53.43, "lon": 14.55, "city": "Szczecin", "elev": 25},
-    "71": {"lat": 53.45, "lon": 14.55, "city": "Szczecin", "elev": 25},
-    "72": {"lat": 53.90, "lon": 14.76, "city": "Świnoujście", "elev": 5},
-    "73": {"lat": 53.17, "lon": 14.60, "city": "Gryfino", "elev": 20},
-    "74": {"lat": 53.69, "lon": 15.79, "city": "Drawsko Pomorskie", "elev": 90},
-    "75": {"lat": 54.17, "lon": 16.05, "city": "Koszalin", "elev": 30},
-    "76": {"lat": 54.46, "lon": 17.03, "city": "Słupsk", "elev": 25},
-    "77": {"lat": 53.77, "lon": 17.05, "city": "Szczecinek", "elev": 135},
-    "78": {"lat": 53.98, "lon": 15.42, "city": "Kołobrzeg", "elev": 5},
-    "79": {"lat": 53.57, "lon": 16.82, "city": "Wałcz", "elev": 110},
-    "80": {"lat": 54.35, "lon": 18.65, "city": "Gdańsk", "elev": 10},
-    "81": {"lat": 54.52, "lon": 18.53, "city": "Gdynia", "elev": 15},
-    "82": {"lat": 54.09, "lon": 19.04, "city": "Malbork", "elev": 10},
-    "83": {"lat": 54.22, "lon": 18.20, "city": "Tczew", "elev": 15},
-    "84": {"lat": 54.61, "lon": 18.22, "city": "Wejherowo", "elev": 30},
-    "85": {"lat": 53.12, "lon": 18.00, "city": "Bydgoszcz", "elev": 60},
-    "86": {"lat": 53.42, "lon": 18.57, "city": "Grudziądz", "elev": 35},
-    "87": {"lat": 53.01, "lon": 18.60, "city": "Toruń", "elev": 65},
-    "88": {"lat": 52.92, "lon": 17.58, "city": "Inowrocław", "elev": 90},
-    "89": {"lat": 53.75, "lon": 17.93, "city": "Chojnice", "elev": 160},
-    "90": {"lat": 51.76, "lon": 19.46, "city": "Łódź", "elev": 200},
-    "91": {"lat": 51.74, "lon": 19.48, "city": "Łódź", "elev": 200},
-    "92": {"lat": 51.78, "lon": 19.52, "city": "Łódź", "elev": 200},
-    "93": {"lat": 51.72, "lon": 19.41, "city": "Łódź", "elev": 195},
-    "94": {"lat": 51.80, "lon": 19.38, "city": "Łódź", "elev": 195},
-    "95": {"lat": 51.91, "lon": 19.82, "city": "Skierniewice", "elev": 125},
-    "96": {"lat": 51.93, "lon": 19.00, "city": "Sieradz", "elev": 150},
-    "97": {"lat": 51.46, "lon": 19.64, "city": "Piotrków Tryb.", "elev": 195},
-    "98": {"lat": 51.59, "lon": 18.93, "city": "Wieluń", "elev": 200},
-    "99": {"lat": 51.66, "lon": 20.48, "city": "Tomaszów Maz.", "elev": 185},
-}
-
-def lookup_polish_postal_code(postal_code: str) -> Optional[Dict]:
+# Read-only: POLISH_POSTAL_RESULTS is derived from it at import
+POLISH_POSTAL_REGIONS = MappingProxyType({
+    "00": PostalRegion(52.23, 21.01, "Warszawa", 100),
+    "01": PostalRegion(52.23, 21.01, "Warszawa", 100),
+    "02": PostalRegion(52.19, 21.00, "Warszawa", 100),
+    "03": PostalRegion(52.27, 21.04, "Warszawa", 100),
+    "04": PostalRegion(52.21, 21.09, "Warszawa", 100),
+    "05": PostalRegion(52.20, 20.85, "Pruszków", 95),
+    "06": PostalRegion(52.82, 20.15, "Płock", 60),
+    "07": PostalRegion(52.66, 21.55, "Wyszków", 95),
+    "08": PostalRegion(52.17, 22.29, "Siedlce", 150),
+    "09": PostalRegion(52.41, 20.31, "Sochaczew", 70),
+    "10": PostalRegion(53.78, 20.48, "Olsztyn", 130),
+    "11": PostalRegion(53.85, 20.02, "Ostróda", 100),
+    "12": PostalRegion(53.25, 20.49, "Szczytno", 140),
+    "13": PostalRegion(53.48, 19.70, "Iława", 110),
+    "14": PostalRegion(54.02, 21.75, "Ełk", 130),
+    "15": PostalRegion(53.13, 23.16, "Białystok", 150),
+    "16": PostalRegion(53.44, 23.87, "Augustów", 120),
+    "17": PostalRegion(52.72, 23.18, "Bielsk Podlaski", 145),
+    "18": PostalRegion(53.74, 22.36, "Grajewo", 125),
+    "19": PostalRegion(52.84, 22.32, "Zambrów", 140),
+    "20": PostalRegion(51.25, 22.57, "Lublin", 200),
+    "21": PostalRegion(51.22, 22.97, "Świdnik", 190),
+    "22": PostalRegion(50.87, 23.86, "Zamość", 220),
+    "23": PostalRegion(50.82, 22.77, "Biłgoraj", 210),
+    "24": PostalRegion(51.52, 21.96, "Puławy", 120),
+    "25": PostalRegion(50.87, 20.63, "Kielce", 260),
+    "26": PostalRegion(51.39, 20.65, "Radom", 180),
+    "27": PostalRegion(50.90, 21.40, "Starachowice", 240),
+    "28": PostalRegion(50.56, 20.44, "Jędrzejów", 275),
+    "29": PostalRegion(51.21, 21.45, "Skarżysko-Kam.", 250),
+    "30": PostalRegion(50.06, 19.94, "Kraków", 220),
+    "31": PostalRegion(50.08, 19.90, "Kraków", 220),
+    "32": PostalRegion(50.05, 19.88, "Kraków", 220),
+    "33": PostalRegion(49.88, 19.49, "Myślenice", 310),
+    "34": PostalRegion(49.99, 20.42, "Bochnia", 210),
+    "35": PostalRegion(50.04, 21.99, "Rzeszów", 220),
+    "36": PostalRegion(50.26, 22.72, "Stalowa Wola", 165),
+    "37": PostalRegion(49.78, 22.76, "Przemyśl", 250),
+    "38": PostalRegion(49.49, 20.68, "Nowy Sącz", 290),
+    "39": PostalRegion(50.30, 22.16, "Tarnobrzeg", 150),
+    "40": PostalRegion(50.26, 19.02, "Katowice", 280),
+    "41": PostalRegion(50.30, 18.93, "Zabrze", 265),
+    "42": PostalRegion(50.21, 19.08, "Tychy", 245),
+    "43": PostalRegion(49.94, 19.21, "Bielsko-Biała", 330),
+    "44": PostalRegion(50.30, 18.67, "Gliwice", 230),
+    "45": PostalRegion(50.67, 17.92, "Opole", 155),
+    "46": PostalRegion(50.27, 17.38, "Nysa", 195),
+    "47": PostalRegion(50.64, 18.28, "Strzelce Opolskie", 200),
+    "48": PostalRegion(50.01, 17.87, "Racibórz", 200),
+    "49": PostalRegion(50.46, 18.16, "Tarnowskie Góry", 295),
+    "50": PostalRegion(51.11, 17.04, "Wrocław", 120),
+    "51": PostalRegion(51.08, 17.08, "Wrocław", 120),
+    "52": PostalRegion(51.12, 16.98, "Wrocław", 115),
+    "53": PostalRegion(51.14, 17.02, "Wrocław", 115),
+    "54": PostalRegion(51.15, 16.93, "Wrocław", 115),
+    "55": PostalRegion(51.29, 16.90, "Oborniki Śląskie", 135),
+    "56": PostalRegion(51.45, 16.28, "Głogów", 80),
+    "57": PostalRegion(50.78, 16.28, "Kłodzko", 320),
+    "58": PostalRegion(50.90, 15.72, "Jelenia Góra", 350),
+    "59": PostalRegion(51.10, 16.15, "Legnica", 115),
+    "60": PostalRegion(52.41, 16.93, "Poznań", 60),
+    "61": PostalRegion(52.40, 16.87, "Poznań", 65),
+    "62": PostalRegion(52.17, 17.08, "Swarzędz", 75),
+    "63": PostalRegion(51.73, 17.47, "Kalisz", 105),
+    "64": PostalRegion(52.01, 16.07, "Leszno", 90),
+    "65": PostalRegion(51.94, 15.51, "Zielona Góra", 80),
+    "66": PostalRegion(52.31, 14.55, "Słubice", 20),
+    "67": PostalRegion(51.72, 14.99, "Żary", 110),
+    "68": PostalRegion(52.11, 14.84, "Świebodzin", 55),
+    "69": PostalRegion(51.60, 15.78, "Żagań", 105),
+    "70": PostalRegion(53.43, 14.55, "Szczecin", 25),
+    "71": PostalRegion(53.45, 14.55, "Szczecin", 25),
+    "72": PostalRegion(53.90, 14.76, "Świnoujście", 5),
+    "73": PostalRegion(53.17, 14.60, "Gryfino", 20),
+    "74": PostalRegion(53.69, 15.79, "Drawsko Pomorskie", 90),
+    "75": PostalRegion(54.17, 16.05, "Koszalin", 30),
+    "76": PostalRegion(54.46, 17.03, "Słupsk", 25),
+    "77": PostalRegion(53.77, 17.05, "Szczecinek", 135),
+    "78": PostalRegion(53.98, 15.42, "Kołobrzeg", 5),
+    "79": PostalRegion(53.57, 16.82, "Wałcz", 110),
+    "80": PostalRegion(54.35, 18.65, "Gdańsk", 10),
+    "81": PostalRegion(54.52, 18.53, "Gdynia", 15),
+    "82": PostalRegion(54.09, 19.04, "Malbork", 10),
+    "83": PostalRegion(54.22, 18.20, "Tczew", 15),
+    "84": PostalRegion(54.61, 18.22, "Wejherowo", 30),
+    "85": PostalRegion(53.12, 18.00, "Bydgoszcz", 60),
+    "86": PostalRegion(53.42, 18.57, "Grudziądz", 35),
+    "87": PostalRegion(53.01, 18.60, "Toruń", 65),
+    "88": PostalRegion(52.92, 17.58, "Inowrocław", 90),
+    "89": PostalRegion(53.75, 17.93, "Chojnice", 160),
+    "90": PostalRegion(51.76, 19.46, "Łódź", 200),
+    "91": PostalRegion(51.74, 19.48, "Łódź", 200),
+    "92": PostalRegion(51.78, 19.52, "Łódź", 200),
+    "93": PostalRegion(51.72, 19.41, "Łódź", 195),
+    "94": PostalRegion(51.80, 19.38, "Łódź", 195),
+    "95": PostalRegion(51.91, 19.82, "Skierniewice", 125),
+    "96": PostalRegion(51.93, 19.00, "Sieradz", 150),
+    "97": PostalRegion(51.46, 19.64, "Piotrków Tryb.", 195),
+    "98": PostalRegion(51.59, 18.93, "Wieluń", 200),
+    "99": PostalRegion(51.66, 20.48, "Tomaszów Maz.", 185),
+})
+
+# Prefix -> shared read-only lookup result, built once instead of per call
+POLISH_POSTAL_RESULTS = MappingProxyType({
+    prefix: MappingProxyType({
+        "latitude": data.lat,
+        "longitude": data.lon,
+        "elevation": data.elev,
+        "city": data.city
+    })
+    for prefix, data in POLISH_POSTAL_REGIONS.items()
+})
+
+@lru_cache(maxsize=4096)
+def lookup_polish_postal_code(postal_code: str) -> Optional[Mapping[str, Any]]:
     """
     Lookup Polish postal code to get approximate coordinates.
     Uses first 2 digits to determine region.
+    Returns a shared read-only mapping from POLISH_POSTAL_RESULTS.
     """
     if not postal_code:
         return None
@@ -373,68 +669,111 @@ def lookup_polish_postal_code(postal_code: str) -> Optional[Dict]:
     digits = ''.join(c for c in postal_code if c.isdigit())
     if len(digits) < 2:
         return None
-    prefix = digits[:2]
-    if prefix in POLISH_POSTAL_REGIONS:
-        data = POLISH_POSTAL_REGIONS[prefix]
-        return {
-            "latitude": data["lat"],
-            "longitude": data["lon"],
-            "elevation": data["elev"],
-            "city": data["city"]
-        }
-    return None
+    return POLISH_POSTAL_RESULTS.get(digits[:2])
 
 
 # Major Polish cities with coordinates and elevations
 # Used as fallback when Nominatim is slow/unavailable
-POLISH_CITIES = {
-    "warszawa": {"lat": 52.2297, "lon": 21.0122, "elev": 100},
-    "krakow": {"lat": 50.0647, "lon": 19.9450, "elev": 219},
-    "kraków": {"lat": 50.0647, "lon": 19.9450, "elev": 219},
-    "lodz": {"lat": 51.7592, "lon": 19.4560, "elev": 200},
-    "łódź": {"lat": 51.7592, "lon": 19.4560, "elev": 200},
-    "wroclaw": {"lat": 51.1079, "lon": 17.0385, "elev": 120},
-    "wrocław": {"lat": 51.1079, "lon": 17.0385, "elev": 120},
-    "poznan": {"lat": 52.4064, "lon": 16.9252, "elev": 60},
-    "poznań": {"lat": 52.4064, "lon": 16.9252, "elev": 60},
-    "gdansk": {"lat": 54.3520, "lon": 18.6466, "elev": 10},
-    "gdańsk": {"lat": 54.3520, "lon": 18.6466, "elev": 10},
-    "szczecin": {"lat": 53.4285, "lon": 14.5528, "elev": 25},
-    "bydgoszcz": {"lat": 53.1235, "lon": 18.0084, "elev": 60},
-    "lublin": {"lat": 51.2465, "lon": 22.5684, "elev": 200},
-    "bialystok": {"lat": 53.1325, "lon": 23.1688, "elev": 150},
-    "białystok": {"lat": 53.1325, "lon": 23.1688, "elev": 150},
-    "katowice": {"lat": 50.2649, "lon": 19.0238, "elev": 280},
-    "czestochowa": {"lat": 50.8118, "lon": 19.1203, "elev": 260},
-    "częstochowa": {"lat": 50.8118, "lon": 19.1203, "elev": 260},
-    "radom": {"lat": 51.4027, "lon": 21.1471, "elev": 180},
-    "torun": {"lat": 53.0138, "lon": 18.5984, "elev": 65},
-    "toruń": {"lat": 53.0138, "lon": 18.5984, "elev": 65},
-    "kielce": {"lat": 50.8661, "lon": 20.6286, "elev": 260},
-    "rzeszow": {"lat": 50.0412, "lon": 21.9991, "elev": 220},
-    "rzeszów": {"lat": 50.0412, "lon": 21.9991, "elev": 220},
-    "olsztyn": {"lat": 53.7784, "lon": 20.4801, "elev": 130},
-    "opole": {"lat": 50.6751, "lon": 17.9213, "elev": 155},
-    "gorzow": {"lat": 52.7368, "lon": 15.2288, "elev": 40},
-    "gorzów": {"lat": 52.7368, "lon": 15.2288, "elev": 40},
-    "zielona gora": {"lat": 51.9356, "lon": 15.5062, "elev": 80},
-    "zielona góra": {"lat": 51.9356, "lon": 15.5062, "elev": 80},
-}
-
-def lookup_polish_city(city: str) -> Optional[Dict]:
-    """Quick lookup for Polish cities."""
-    if not city:
+# Keys are canonical lowercase names - ASCII spellings ("krakow", "lodz")
+# are resolved through POLISH_CITY_INDEX. Read-only, as lookup results are derived from it at import.
+POLISH_CITIES = MappingProxyType({
+    "warszawa": CityRecord(52.2297, 21.0122, 100),
+    "kraków": CityRecord(50.0647, 19.9450, 219),
+    "łódź": CityRecord(51.7592, 19.4560, 200),
+    "wrocław": CityRecord(51.1079, 17.0385, 120),
+    "poznań": CityRecord(52.4064, 16.9252, 60),
+    "gdańsk": CityRecord(54.3520, 18.6466, 10),
+    "szczecin": CityRecord(53.4285, 14.5528, 25),
+    "bydgoszcz": CityRecord(53.1235, 18.0084, 60),
+    "lublin": CityRecord(51.2465, 22.5684, 200),
+    "białystok": CityRecord(53.1325, 23.1688, 150),
+    "katowice": CityRecord(50.2649, 19.0238, 280),
+    "częstochowa": CityRecord(50.8118, 19.1203, 260),
+    "radom": CityRecord(51.4027, 21.1471, 180),
+    "toruń": CityRecord(53.0138, 18.5984, 65),
+    "kielce": CityRecord(50.8661, 20.6286, 260),
+    "rzeszów": CityRecord(50.0412, 21.9991, 220),
+    "olsztyn": CityRecord(53.7784, 20.4801, 130),
+    "opole": CityRecord(50.6751, 17.9213, 155),
+    "gorzów": CityRecord(52.7368, 15.2288, 40),
+    "zielona góra": CityRecord(51.9356, 15.5062, 80),
+})
+
+# Polish diacritics -> ASCII ("ł" has no Unicode decomposition, so NFKD alone is not enough)
+POLISH_ASCII_FOLD = str.maketrans("ąćęłńóśźż", "acelnoszz")
+
+@lru_cache(maxsize=8192)
+def fold_city_name(city: str) -> str:
+    """Normalize city name and fold Polish diacritics to ASCII ("Łódź" -> "lodz")."""
+    return normalize_city_name(city).translate(POLISH_ASCII_FOLD)
+
+# ASCII-folded name -> POLISH_CITIES record (resolved once, so lookups need a single probe)
+POLISH_CITY_INDEX = MappingProxyType({fold_city_name(name): data for name, data in POLISH_CITIES.items()})
+
+# Display names for /geo/cities/pl ("zielona góra" -> "Zielona Góra")
+POLISH_CITY_TITLES = tuple(name.title() for name in POLISH_CITIES)
+
+# Folded name -> shared read-only lookup result
+POLISH_CITY_RESULTS = MappingProxyType({
+    folded: MappingProxyType({
+        "latitude": data.lat,
+        "longitude": data.lon,
+        "elevation": data.elev
+    })
+    for folded, data in POLISH_CITY_INDEX.items()
+})
+
+def lookup_polish_city(city: str) -> Optional[Mapping[str, Any]]:
+    """Quick lookup for Polish cities (returns a shared read-only mapping)."""
+    return POLISH_CITY_RESULTS.get(fold_city_name(city))
+
+def lookup_polish_quick(
+    country: str,
+    postal_code: Optional[str],
+    city: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """Resolve a PL location from the preloaded city/postal tables (no external API)."""
+    if country.upper() != "PL":
         return None
-    city_lower = city.lower().strip()
-    if city_lower in POLISH_CITIES:
-        data = POLISH_CITIES[city_lower]
-        return {
-            "latitude": data["lat"],
-            "longitude": data["lon"],
-            "elevation": data["elev"]
-        }
+
+    # Try city lookup first
+    if city:
+        quick_result = lookup_polish_city(city)
+        if quick_result:
+            return {
+                **quick_result,
+                "display_name": f"{city}, Polska",
+                "country": "PL",
+                "postal_code": postal_code,
+                "city": city,
+                "source": "preloaded"
+            }
+
+    # Try postal code lookup (uses regional database)
+    if postal_code:
+        postal_result = lookup_polish_postal_code(postal_code)
+        if postal_result:
+            formatted_postal = format_polish_postal_code(postal_code)
+            return {
+                **postal_result,
+                "display_name": f"{formatted_postal}, {postal_result['city']}, Polska",
+                "country": "PL",
+                "postal_code": formatted_postal,
+                "source": "postal_database"
+            }
+
     return None
 
+def remember_quick_result(
+    country: str,
+    postal_code: Optional[str],
+    city: Optional[str],
+    result: Dict[str, Any]
+) -> GeoLocation:
+    """Cache a preloaded PL lookup under the request key and build the response."""
+    geo_cache.set(country, postal_code or "", city or "", result)
+    return GeoLocation(**result, cached=False)
+
 # ============================================
 # API ENDPOINTS
 # ============================================
@@ -472,6 +811,10 @@ async def resolve_geo(
     - /geo/resolve?country=PL&city=Warszawa
     - /geo/resolve?country=PL&postal_code=00-001&city=Warszawa
     """
+    # Surrounding whitespace is not part of the name (and would end up in display_name)
+    postal_code = postal_code.strip() if postal_code else postal_code
+    city = city.strip() if city else city
+
     if not postal_code and not city:
         raise HTTPException(
             status_code=400,
@@ -482,47 +825,15 @@ async def resolve_geo(
     if use_cache:
         cached = geo_cache.get(country, postal_code or "", city or "")
         if cached:
-            return GeoLocation(**cached, cached=True)
+            return GeoLocation(**with_request_names(cached, postal_code, city, country), cached=True)
 
     # For Poland, try quick lookups first (no external API needed)
-    if country.upper() == "PL":
-        # Try city lookup first
-        if city:
-            quick_result = lookup_polish_city(city)
-            if quick_result:
-                result = {
-                    "latitude": quick_result["latitude"],
-                    "longitude": quick_result["longitude"],
-                    "elevation": quick_result["elevation"],
-                    "display_name": f"{city}, Polska",
-                    "country": "PL",
-                    "postal_code": postal_code,
-                    "city": city,
-                    "source": "preloaded"
-                }
-                geo_cache.set(country, postal_code or "", city or "", result)
-                return GeoLocation(**result, cached=False)
-
-        # Try postal code lookup (uses regional database)
-        if postal_code:
-            postal_result = lookup_polish_postal_code(postal_code)
-            if postal_result:
-                formatted_postal = format_polish_postal_code(postal_code)
-                result = {
-                    "latitude": postal_result["latitude"],
-                    "longitude": postal_result["longitude"],
-                    "elevation": postal_result["elevation"],
-                    "display_name": f"{formatted_postal}, {postal_result['city']}, Polska",
-                    "country": "PL",
-                    "postal_code": formatted_postal,
-                    "city": postal_result["city"],
-                    "source": "postal_database"
-                }
-                geo_cache.set(country, postal_code or "", city or "", result)
-                return GeoLocation(**result, cached=False)
+    quick_result = lookup_polish_quick(country, postal_code, city)
+    if quick_result:
+        return remember_quick_result(country, postal_code, city, quick_result)
 
     # Full geocoding via Nominatim (fallback)
-    result = await resolve_location(country, postal_code, city)
+    result = await resolve_location(country, postal_code, city, use_cache=use_cache)
 
     if not result:
         # For Poland, return error with suggestion
@@ -573,16 +884,51 @@ async def resolve_batch(locations: list[GeoResolveRequest]):
             detail="Maximum 10 locations per batch request"
         )
 
-    results = []
     for loc in locations:
-        try:
-            result = await resolve_location(loc.country, loc.postal_code, loc.city)
-            results.append(result.dict() if result else {"error": "Not found"})
-        except Exception as e:
-            results.append({"error": str(e)})
+        loc.postal_code = loc.postal_code.strip() if loc.postal_code else loc.postal_code
+        loc.city = loc.city.strip() if loc.city else loc.city
+
+    # Resolve each unique (normalized) location once - duplicates in the
+    # batch share the result instead of waiting for another Nominatim slot
+    keys = [normalize_location_key(loc.country, loc.postal_code or "", loc.city or "") for loc in locations]
+    unique: Dict[Tuple[str, str, str], GeoResolveRequest] = {}
+    for key, loc in zip(keys, locations, strict=True):
+        unique.setdefault(key, loc)
+
+    # Preloaded Polish cities/postal regions resolve locally, in one pass,
+    # so they never queue behind the Nominatim rate limit
+    by_key: Dict[Tuple[str, str, str], Any] = {}
+    for key, loc in unique.items():
+        quick_result = lookup_polish_quick(loc.country, loc.postal_code, loc.city)
+        if quick_result:
+            by_key[key] = remember_quick_result(loc.country, loc.postal_code, loc.city, quick_result)
+    pending = {key: loc for key, loc in unique.items() if key not in by_key}
+
+    # Resolve the rest concurrently - cached entries return immediately, while
+    # Nominatim requests are serialized by NOMINATIM_LIMITER (1 req/sec)
+    unique_results = await asyncio.gather(
+        *(resolve_location(loc.country, loc.postal_code, loc.city, fetch_elevation=False) for loc in pending.values()),
+        return_exceptions=True
+    )
+    by_key.update(zip(pending.keys(), unique_results, strict=True))
+    resolved = [by_key[key] for key in keys]
+
+    # Fetch elevations for all freshly geocoded locations in one request
+    fresh = [r for r in unique_results if isinstance(r, GeoLocation) and not r.cached]
+    if fresh:
+        elevations = await get_elevations_batch([(r.latitude, r.longitude) for r in fresh])
+        for loc, elevation in zip(fresh, elevations, strict=True):
+            loc.elevation = elevation
+            geo_cache.set(loc.country, loc.postal_code or "", loc.city or "", loc.model_dump(exclude={"cached"}))
 
-        # Rate limiting - wait between requests
-        await asyncio.sleep(1.1)  # Nominatim requires 1 req/sec
+    results = []
+    for loc, result in zip(locations, resolved, strict=True):
+        if isinstance(result, Exception):
+            results.append({"error": str(result)})
+        elif result:
+            results.append(with_request_names(result.model_dump(), loc.postal_code, loc.city, loc.country))
+        else:
+            results.append({"error": "Not found"})
 
     return {"results": results}
 
@@ -595,14 +941,15 @@ async def cache_stats():
 async def cache_clear():
     """Clear the cache."""
     geo_cache.clear()
+    _elevation_cache.clear()
     return {"status": "Cache cleared"}
 
 @app.get("/geo/cities/pl")
 async def get_polish_cities():
     """Get list of preloaded Polish cities."""
     return {
-        "count": len(POLISH_CITIES),
-        "cities": list(set(c.title() for c in POLISH_CITIES.keys()))
+        "count": len(POLISH_CITY_TITLES),
+        "cities": POLISH_CITY_TITLES
     }
 
 if __name__ == "__main__":
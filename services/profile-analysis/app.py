@@ -18,15 +18,38 @@ from typing import List, Dict, Optional, Tuple, Any
 from dataclasses import dataclass
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 import json
+import asyncio
+import base64
+import binascii
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
 import httpx
 from enum import Enum
+from functools import lru_cache
+from itertools import groupby
+
+# Optional: Numba JIT for the hourly BESS dispatch loop
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    print("⚠️ numba not installed - BESS simulation runs in pure Python")
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Profile Analysis Service",
     description="Advanced PV+BESS profile analysis for optimal sizing v2.0",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -41,6 +64,71 @@ app.add_middleware(
 BESS_OPTIMIZER_URL = "http://pv-bess-optimizer:8030"
 
 
+# ============== Analysis Cache ==============
+
+class AnalysisCache:
+    """
+    Small LRU cache for strategy-independent analysis stages.
+
+    Clients often resend the same profiles with only a different strategy or
+    cycle range, so patterns, heatmap, monthly analysis and the Pareto sweep
+    are memoized by profile fingerprint + the parameters they depend on.
+    Cached values are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self._cache: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()  # /analyze runs in worker threads
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: tuple) -> Optional[Any]:
+        """Get cached value (None on miss)."""
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return self._cache[key]
+            self._misses += 1
+            return None
+
+    def set(self, key: tuple, value: Any):
+        """Cache value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_entries:
+                self._cache.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """Return cache statistics."""
+        with self._lock:
+            return {
+                'entries': len(self._cache),
+                'max_entries': self._max_entries,
+                'hits': self._hits,
+                'misses': self._misses
+            }
+
+
+analysis_cache = AnalysisCache()
+
+
+def profile_fingerprint(
+    pv_kwh: np.ndarray,
+    load_kwh: np.ndarray,
+    timestamps: Optional[List[str]] = None
+) -> bytes:
+    """Content hash of the (resampled) profiles and their timestamps"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(pv_kwh, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(load_kwh, dtype=np.float64).tobytes())
+    if timestamps:
+        h.update("\n".join(timestamps).encode())
+    return h.digest()
+
+
 # ============== Enums ==============
 
 class OptimizationStrategy(str, Enum):
@@ -53,8 +141,13 @@ class OptimizationStrategy(str, Enum):
 
 class ProfileAnalysisRequest(BaseModel):
     """Request for profile analysis"""
-    pv_generation_kwh: List[float] = Field(..., description="Hourly PV generation [kWh]")
-    load_kwh: List[float] = Field(..., description="Hourly load [kWh]")
+    pv_generation_kwh: Optional[List[float]] = Field(None, description="Hourly PV generation [kWh]")
+    load_kwh: Optional[List[float]] = Field(None, description="Hourly load [kWh]")
+
+    # Compact alternative to the lists above: base64 of little-endian float64 values
+    # (8 bytes per value, decoded with np.frombuffer - no per-element JSON parsing)
+    pv_generation_b64: Optional[str] = Field(None, description="Base64 '<f8' PV generation [kWh]")
+    load_b64: Optional[str] = Field(None, description="Base64 '<f8' load [kWh]")
     pv_capacity_kwp: float = Field(..., gt=0, description="PV capacity [kWp]")
 
     # Timestamps for proper month mapping (ISO format strings)
@@ -277,6 +370,54 @@ class ProfileAnalysisResult(BaseModel):
 
 # ============== Analysis Functions ==============
 
+def profile_array(values: Optional[List[float]], b64: Optional[str], name: str) -> np.ndarray:
+    """Return a profile as float64 array, from its JSON list or base64 '<f8' form"""
+    if b64:
+        try:
+            raw = base64.b64decode(b64, validate=True)
+        except binascii.Error:
+            raise HTTPException(400, f"{name}_b64 is not valid base64")
+        if len(raw) % 8:
+            raise HTTPException(400, f"{name}_b64 length is not a multiple of 8 bytes (float64)")
+        return np.frombuffer(raw, dtype='<f8').astype(np.float64)
+    if values is None:
+        raise HTTPException(400, f"{name}_kwh or {name}_b64 is required")
+    return np.array(values)
+
+
+def resample_profile(arr: np.ndarray, target_n: int) -> np.ndarray:
+    """Resample profile to target_n steps, keeping per-step magnitudes.
+
+    15-min <-> hourly (the common case) uses block mean / repeat - exact step
+    alignment in a single pass. Other ratios fall back to linear interpolation.
+    """
+    n = len(arr)
+    if n == target_n * 4:
+        return arr.reshape(target_n, 4).mean(axis=1)
+    if target_n == n * 4:
+        return np.repeat(arr, 4)
+    x_old = np.linspace(0, 1, n)
+    x_new = np.linspace(0, 1, target_n)
+    return np.interp(x_new, x_old, arr)
+
+
+def rounded_list(arr: np.ndarray, decimals: int) -> List[float]:
+    """
+    Round an hourly series for the JSON response, same values as round(x, decimals).
+
+    np.round scales by 10**decimals first, which can tip exact decimal ties
+    (e.g. 11.055) the other way; those few steps are re-rounded with round().
+    """
+    arr = np.asarray(arr, dtype=np.float64)
+    rounded = np.round(arr, decimals)
+    scaled = arr * 10.0 ** decimals
+    with np.errstate(invalid='ignore'):
+        ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(ties).tolist():
+        rounded[i] = round(float(arr[i]), decimals)
+    return rounded.tolist()
+
+
 def analyze_hourly_patterns(
     pv_kwh: np.ndarray,
     load_kwh: np.ndarray,
@@ -288,26 +429,35 @@ def analyze_hourly_patterns(
     steps_per_day = int(24 / hours_per_step)
     n_days = n // steps_per_day
 
-    patterns = []
-
-    for hour in range(24):
-        step_in_day = int(hour / hours_per_step)
-        indices = [day * steps_per_day + step_in_day for day in range(n_days)]
-
-        hour_pv = pv_kwh[indices]
-        hour_load = load_kwh[indices]
-        hour_surplus = np.maximum(hour_pv - hour_load, 0)
-        hour_deficit = np.maximum(hour_load - hour_pv, 0)
+    # One row per day, one column per hour (first step of each hour)
+    step_in_day = (np.arange(24) / hours_per_step).astype(int)
+    hour_pv = pv_kwh[:n_days * steps_per_day].reshape(n_days, steps_per_day)[:, step_in_day]
+    hour_load = load_kwh[:n_days * steps_per_day].reshape(n_days, steps_per_day)[:, step_in_day]
+    hour_surplus = np.maximum(hour_pv - hour_load, 0)
+    hour_deficit = np.maximum(hour_load - hour_pv, 0)
+
+    columns = zip(
+        hour_pv.mean(axis=0).tolist(),
+        hour_load.mean(axis=0).tolist(),
+        hour_surplus.mean(axis=0).tolist(),
+        hour_deficit.mean(axis=0).tolist(),
+        (np.count_nonzero(hour_surplus > 0, axis=0) / n_days * 100).tolist(),
+        (np.count_nonzero(hour_deficit > 0, axis=0) / n_days * 100).tolist(),
+        strict=True
+    )
 
-        patterns.append(HourlyPattern(
+    patterns = [
+        HourlyPattern(
             hour=hour,
-            avg_pv_kwh=float(np.mean(hour_pv)),
-            avg_load_kwh=float(np.mean(hour_load)),
-            avg_surplus_kwh=float(np.mean(hour_surplus)),
-            avg_deficit_kwh=float(np.mean(hour_deficit)),
-            surplus_frequency_pct=float(np.sum(hour_surplus > 0) / n_days * 100),
-            deficit_frequency_pct=float(np.sum(hour_deficit > 0) / n_days * 100)
-        ))
+            avg_pv_kwh=avg_pv,
+            avg_load_kwh=avg_load,
+            avg_surplus_kwh=avg_surplus,
+            avg_deficit_kwh=avg_deficit,
+            surplus_frequency_pct=surplus_freq,
+            deficit_frequency_pct=deficit_freq
+        )
+        for hour, (avg_pv, avg_load, avg_surplus, avg_deficit, surplus_freq, deficit_freq) in enumerate(columns)
+    ]
 
     return patterns
 
@@ -322,6 +472,7 @@ def generate_heatmap(
     days_per_month = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
     steps_per_hour = int(1 / hours_per_step)
     steps_per_day = 24 * steps_per_hour
+    step_in_day = (np.arange(24) / hours_per_step).astype(int)
 
     heatmap = []
     start_idx = 0
@@ -334,29 +485,30 @@ def generate_heatmap(
         if start_idx >= len(pv_kwh):
             break
 
-        month_pv = pv_kwh[start_idx:end_idx]
-        month_load = load_kwh[start_idx:end_idx]
-
-        # Group by hour within month
-        for hour in range(24):
-            hour_indices = []
-            for day in range(days):
-                idx = day * steps_per_day + int(hour / hours_per_step)
-                if idx < len(month_pv):
-                    hour_indices.append(idx)
-
-            if hour_indices:
-                hour_pv = month_pv[hour_indices]
-                hour_load = month_load[hour_indices]
-                hour_surplus = np.maximum(hour_pv - hour_load, 0)
-                hour_deficit = np.maximum(hour_load - hour_pv, 0)
-
+        # (day, hour) grid of net energy - zero-padded if the data ends mid-month
+        month_len = end_idx - start_idx
+        net = np.zeros(steps_in_month)
+        net[:month_len] = pv_kwh[start_idx:end_idx] - load_kwh[start_idx:end_idx]
+        net = net.reshape(days, steps_per_day)[:, step_in_day]
+
+        # Number of days that actually reach each hour (fewer in a truncated month)
+        counts = np.clip((month_len - step_in_day + steps_per_day - 1) // steps_per_day, 0, days)
+
+        sums = zip(
+            np.maximum(net, 0).sum(axis=0).tolist(),
+            np.maximum(-net, 0).sum(axis=0).tolist(),
+            net.sum(axis=0).tolist(),
+            counts.tolist(),
+            strict=True
+        )
+        for hour, (surplus_sum, deficit_sum, net_sum, count) in enumerate(sums):
+            if count:
                 heatmap.append(HeatmapCell(
                     hour=hour,
                     month=month + 1,
-                    avg_surplus_kwh=float(np.mean(hour_surplus)),
-                    avg_deficit_kwh=float(np.mean(hour_deficit)),
-                    net_kwh=float(np.mean(hour_pv - hour_load))
+                    avg_surplus_kwh=surplus_sum / count,
+                    avg_deficit_kwh=deficit_sum / count,
+                    net_kwh=net_sum / count
                 ))
 
         start_idx = end_idx
@@ -364,6 +516,40 @@ def generate_heatmap(
     return heatmap
 
 
+def timestamp_month_day(timestamps: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calendar month (1-12) and day of month for each ISO timestamp.
+
+    The date part is parsed for all timestamps at once with datetime64; if any of
+    them is not plain "YYYY-MM-DD..." it falls back to datetime.fromisoformat per
+    timestamp. Unparseable timestamps get month 0.
+    """
+    try:
+        date_parts = [ts[:10] for ts in timestamps]
+        if any(len(part) != 10 for part in date_parts):
+            raise ValueError("not a YYYY-MM-DD date prefix")
+        dates = np.array(date_parts, dtype='datetime64[D]')
+    except (ValueError, TypeError):
+        from datetime import datetime
+
+        months = np.zeros(len(timestamps), dtype=np.int64)
+        days = np.zeros(len(timestamps), dtype=np.int64)
+        for i, ts_str in enumerate(timestamps):
+            try:
+                # Parse ISO timestamp (e.g., "2024-07-01T00:00:00")
+                ts = datetime.fromisoformat(ts_str.replace('Z', '+00:00').split('+')[0])
+                months[i] = ts.month
+                days[i] = ts.day
+            except (ValueError, AttributeError):
+                continue
+        return months, days
+
+    month_start = dates.astype('datetime64[M]')
+    months = month_start.astype(np.int64) % 12 + 1
+    days = (dates - month_start).astype(np.int64) + 1
+    return months, days
+
+
 def analyze_monthly(
     pv_kwh: np.ndarray,
     load_kwh: np.ndarray,
@@ -378,39 +564,34 @@ def analyze_monthly(
     This is critical because analytical year may start from any month (e.g., July 2024).
     Without timestamps, the function assumes data starts from January which may be wrong.
     """
-    from datetime import datetime
-    from collections import defaultdict
-
     month_names = ['Sty', 'Lut', 'Mar', 'Kwi', 'Maj', 'Cze',
                    'Lip', 'Sie', 'Wrz', 'Paź', 'Lis', 'Gru']
 
+    # One-way efficiency, computed once for all months
+    sqrt_eff = float(np.sqrt(bess_efficiency))
+
     # If timestamps provided, group by actual calendar months
     if timestamps and len(timestamps) == len(pv_kwh):
-        # Parse timestamps and group data by month
-        month_data = defaultdict(lambda: {'pv': [], 'load': [], 'days': set()})
-
-        for i, ts_str in enumerate(timestamps):
-            try:
-                # Parse ISO timestamp (e.g., "2024-07-01T00:00:00")
-                ts = datetime.fromisoformat(ts_str.replace('Z', '+00:00').split('+')[0])
-                month_num = ts.month  # 1-12
-                day = ts.day
-                month_data[month_num]['pv'].append(pv_kwh[i])
-                month_data[month_num]['load'].append(load_kwh[i])
-                month_data[month_num]['days'].add(day)
-            except (ValueError, AttributeError):
-                continue
+        # Calendar month/day per step, then one stable sort groups the steps by
+        # month while keeping their original order within each month
+        months, days_of_month = timestamp_month_day(timestamps)
+        order = np.argsort(months, kind='stable')
+        month_bounds = np.searchsorted(months[order], np.arange(1, 14))
+        pv_by_month = pv_kwh[order]
+        load_by_month = load_kwh[order]
+        # Distinct days per month (month 0 = unparseable timestamps, ignored)
+        days_per_month = np.bincount(np.unique(months * 32 + days_of_month) // 32, minlength=13)
 
         results = []
         # Iterate through months 1-12 (January to December)
         for month_num in range(1, 13):
-            if month_num not in month_data:
+            start, end = month_bounds[month_num - 1], month_bounds[month_num]
+            if start == end:
                 continue
 
-            data = month_data[month_num]
-            month_pv = np.array(data['pv'])
-            month_load = np.array(data['load'])
-            days = len(data['days'])
+            month_pv = pv_by_month[start:end]
+            month_load = load_by_month[start:end]
+            days = int(days_per_month[month_num])
 
             if days == 0 or len(month_pv) == 0:
                 continue
@@ -426,15 +607,15 @@ def analyze_monthly(
             avg_daily_surplus = total_surplus / days
             avg_daily_deficit = total_deficit / days
 
-            surplus_hours = np.sum(surplus > 0) * hours_per_step / days
-            deficit_hours = np.sum(deficit > 0) * hours_per_step / days
+            surplus_hours = np.count_nonzero(month_pv > month_load) * hours_per_step / days
+            deficit_hours = np.count_nonzero(month_load > month_pv) * hours_per_step / days
 
-            optimal_bess = avg_daily_surplus * 0.8 / np.sqrt(bess_efficiency)
+            optimal_bess = avg_daily_surplus * 0.8 / sqrt_eff
 
             current_cycles = None
             if bess_energy_kwh and bess_energy_kwh > 0:
                 usable = bess_energy_kwh * 0.8
-                daily_charge = min(avg_daily_surplus * np.sqrt(bess_efficiency), usable)
+                daily_charge = min(avg_daily_surplus * sqrt_eff, usable)
                 current_cycles = daily_charge / usable * days if usable > 0 else 0
 
             results.append(MonthlyAnalysis(
@@ -484,15 +665,15 @@ def analyze_monthly(
         avg_daily_surplus = total_surplus / days
         avg_daily_deficit = total_deficit / days
 
-        surplus_hours = np.sum(surplus > 0) * hours_per_step / days
-        deficit_hours = np.sum(deficit > 0) * hours_per_step / days
+        surplus_hours = np.count_nonzero(month_pv > month_load) * hours_per_step / days
+        deficit_hours = np.count_nonzero(month_load > month_pv) * hours_per_step / days
 
-        optimal_bess = avg_daily_surplus * 0.8 / np.sqrt(bess_efficiency)
+        optimal_bess = avg_daily_surplus * 0.8 / sqrt_eff
 
         current_cycles = None
         if bess_energy_kwh and bess_energy_kwh > 0:
             usable = bess_energy_kwh * 0.8
-            daily_charge = min(avg_daily_surplus * np.sqrt(bess_efficiency), usable)
+            daily_charge = min(avg_daily_surplus * sqrt_eff, usable)
             current_cycles = daily_charge / usable * days if usable > 0 else 0
 
         results.append(MonthlyAnalysis(
@@ -523,10 +704,20 @@ def calculate_npv(
     project_years: int
 ) -> float:
     """Calculate Net Present Value (simple model without degradation)"""
-    npv = -capex
-    for year in range(1, project_years + 1):
-        npv += annual_savings / ((1 + discount_rate) ** year)
-    return npv
+    return annual_savings * annuity_factor(discount_rate, project_years) - capex
+
+
+def annuity_factor(discount_rate: float, project_years: int) -> float:
+    """Present value of 1 PLN received yearly for project_years (closed form of sum 1/(1+r)^y)."""
+    if discount_rate == 0:
+        return float(project_years)
+    return (1 - (1 + discount_rate) ** -project_years) / discount_rate
+
+
+@lru_cache(maxsize=64)
+def discount_factors(discount_rate: float, project_years: int) -> Tuple[float, ...]:
+    """Yearly discount factors 1/(1+r)^year, year = 1..project_years (shared by all Pareto points)."""
+    return tuple(1 / ((1 + discount_rate) ** year) for year in range(1, project_years + 1))
 
 
 def calculate_npv_with_degradation(
@@ -575,7 +766,7 @@ def calculate_npv_with_degradation(
     total_auxiliary_cost = 0.0
     yearly_details = []
 
-    for year in range(1, project_years + 1):
+    for year, discount_factor in enumerate(discount_factors(discount_rate, project_years), start=1):
         # Calculate effective capacity for this year (degradation applied)
         # Degradation reduces capacity linearly each year
         effective_capacity_pct = 100 - degradation_pct_per_year * (year - 1)
@@ -594,7 +785,6 @@ def calculate_npv_with_degradation(
         year_net_cf = year_savings - year_auxiliary_cost
 
         # Discount to present value
-        discount_factor = 1 / ((1 + discount_rate) ** year)
         npv += year_net_cf * discount_factor
 
         total_savings += year_savings
@@ -660,49 +850,27 @@ async def call_bess_optimizer(
     return None
 
 
-def simulate_bess_hourly(
+def bess_dispatch(
     pv_kwh: np.ndarray,
     load_kwh: np.ndarray,
     bess_energy_kwh: float,
     bess_power_kw: float,
-    efficiency: float,
-    soc_min_pct: float = 10.0,
-    soc_max_pct: float = 90.0
-) -> dict:
+    one_way_eff: float,
+    soc_min_pct: float,
+    soc_max_pct: float,
+    hourly_charge: np.ndarray,
+    hourly_discharge: np.ndarray,
+    hourly_soc: np.ndarray
+) -> Tuple[float, float]:
     """
-    Simulate BESS operation hour by hour with real SoC tracking.
+    Hourly dispatch loop of simulate_bess_hourly().
 
-    This is the accurate simulation that should be used for all calculations.
-    It replaces the simplified statistical model that overestimates performance.
-
-    Args:
-        pv_kwh: Hourly PV generation array [kWh]
-        load_kwh: Hourly load array [kWh]
-        bess_energy_kwh: Total BESS capacity [kWh]
-        bess_power_kw: Maximum charge/discharge power [kW]
-        efficiency: Round-trip efficiency (e.g., 0.90 for 90%)
-        soc_min_pct: Minimum SoC in % (default 10%)
-        soc_max_pct: Maximum SoC in % (default 90%)
-
-    Returns:
-        dict with:
-            - annual_charge_kwh: Total energy charged from surplus
-            - annual_discharge_kwh: Total energy delivered to load
-            - annual_cycles: Equivalent full cycles (discharge / usable_capacity)
-            - hourly_charge: Array of hourly charge values
-            - hourly_discharge: Array of hourly discharge values
-            - hourly_soc: Array of hourly SoC values (%)
+    Fills hourly_charge/hourly_discharge/hourly_soc in place and returns
+    (total_charge, total_discharge). Compiled with Numba when available
+    (no fastmath, so results match the pure-Python loop exactly; the GIL is
+    released while it runs).
     """
     n_hours = len(pv_kwh)
-    one_way_eff = np.sqrt(efficiency)
-
-    # Usable capacity (DoD)
-    usable_capacity = bess_energy_kwh * (soc_max_pct - soc_min_pct) / 100.0
-
-    # Initialize arrays
-    hourly_charge = np.zeros(n_hours)
-    hourly_discharge = np.zeros(n_hours)
-    hourly_soc = np.zeros(n_hours)
 
     # Start at middle SoC
     soc_pct = (soc_min_pct + soc_max_pct) / 2.0
@@ -711,8 +879,8 @@ def simulate_bess_hourly(
     total_discharge = 0.0
 
     for i in range(n_hours):
-        surplus = max(0, pv_kwh[i] - load_kwh[i])
-        deficit = max(0, load_kwh[i] - pv_kwh[i])
+        surplus = max(0.0, pv_kwh[i] - load_kwh[i])
+        deficit = max(0.0, load_kwh[i] - pv_kwh[i])
 
         charge = 0.0
         discharge = 0.0
@@ -726,7 +894,7 @@ def simulate_bess_hourly(
             # Energy that will be stored (after charging losses)
             energy_to_store = min(max_charge_from_surplus * one_way_eff, available_capacity_kwh)
             # Energy taken from surplus
-            charge = energy_to_store / one_way_eff if one_way_eff > 0 else 0
+            charge = energy_to_store / one_way_eff if one_way_eff > 0 else 0.0
             # Update SoC
             soc_pct += energy_to_store / bess_energy_kwh * 100.0
             total_charge += charge
@@ -738,7 +906,7 @@ def simulate_bess_hourly(
             # Energy needed to cover deficit
             energy_needed = min(bess_power_kw, deficit)
             # Energy we need to extract from battery (to deliver energy_needed after losses)
-            energy_from_battery = min(energy_needed / one_way_eff, available_energy_kwh) if one_way_eff > 0 else 0
+            energy_from_battery = min(energy_needed / one_way_eff, available_energy_kwh) if one_way_eff > 0 else 0.0
             # What we actually deliver to load
             discharge = energy_from_battery * one_way_eff
             # Update SoC
@@ -752,6 +920,66 @@ def simulate_bess_hourly(
         hourly_discharge[i] = discharge
         hourly_soc[i] = soc_pct
 
+    return total_charge, total_discharge
+
+
+if NUMBA_AVAILABLE:
+    # nogil: concurrent /analyze worker threads run the compiled loop in parallel
+    bess_dispatch = njit(cache=True, nogil=True)(bess_dispatch)
+
+
+def simulate_bess_hourly(
+    pv_kwh: np.ndarray,
+    load_kwh: np.ndarray,
+    bess_energy_kwh: float,
+    bess_power_kw: float,
+    efficiency: float,
+    soc_min_pct: float = 10.0,
+    soc_max_pct: float = 90.0
+) -> dict:
+    """
+    Simulate BESS operation hour by hour with real SoC tracking.
+
+    This is the accurate simulation that should be used for all calculations.
+    It replaces the simplified statistical model that overestimates performance.
+
+    Args:
+        pv_kwh: Hourly PV generation array [kWh]
+        load_kwh: Hourly load array [kWh]
+        bess_energy_kwh: Total BESS capacity [kWh]
+        bess_power_kw: Maximum charge/discharge power [kW]
+        efficiency: Round-trip efficiency (e.g., 0.90 for 90%)
+        soc_min_pct: Minimum SoC in % (default 10%)
+        soc_max_pct: Maximum SoC in % (default 90%)
+
+    Returns:
+        dict with:
+            - annual_charge_kwh: Total energy charged from surplus
+            - annual_discharge_kwh: Total energy delivered to load
+            - annual_cycles: Equivalent full cycles (discharge / usable_capacity)
+            - hourly_charge: Array of hourly charge values
+            - hourly_discharge: Array of hourly discharge values
+            - hourly_soc: Array of hourly SoC values (%)
+    """
+    n_hours = len(pv_kwh)
+    one_way_eff = float(np.sqrt(efficiency))  # plain float keeps the hourly loop off numpy scalars
+
+    # Usable capacity (DoD)
+    usable_capacity = bess_energy_kwh * (soc_max_pct - soc_min_pct) / 100.0
+
+    # Initialize arrays
+    hourly_charge = np.zeros(n_hours)
+    hourly_discharge = np.zeros(n_hours)
+    hourly_soc = np.zeros(n_hours)
+
+    total_charge, total_discharge = bess_dispatch(
+        np.ascontiguousarray(pv_kwh, dtype=np.float64),
+        np.ascontiguousarray(load_kwh, dtype=np.float64),
+        float(bess_energy_kwh), float(bess_power_kw), one_way_eff,
+        float(soc_min_pct), float(soc_max_pct),
+        hourly_charge, hourly_discharge, hourly_soc
+    )
+
     # Calculate equivalent cycles based on discharge
     annual_cycles = total_discharge / usable_capacity if usable_capacity > 0 else 0
 
@@ -765,7 +993,94 @@ def simulate_bess_hourly(
     }
 
 
-async def generate_pareto_frontier(
+def simulate_bess_batch(
+    pv_kwh: np.ndarray,
+    load_kwh: np.ndarray,
+    energies_kwh: np.ndarray,
+    powers_kw: np.ndarray,
+    efficiency: float,
+    soc_min_pct: float = 10.0,
+    soc_max_pct: float = 90.0
+) -> dict:
+    """
+    Run simulate_bess_hourly() for many BESS sizes in one pass.
+
+    The hour loop is sequential (SoC carries over), but the sizes are independent,
+    so every hour updates all of them with vector operations. With Numba each size
+    runs through the compiled bess_dispatch() loop instead. Same dispatch rules
+    and results as simulate_bess_hourly(); only annual totals are returned.
+
+    Returns:
+        dict with arrays (one value per size):
+            - annual_charge_kwh, annual_discharge_kwh, annual_cycles
+    """
+    energies_kwh = np.asarray(energies_kwh, dtype=float)
+    powers_kw = np.asarray(powers_kw, dtype=float)
+    one_way_eff = np.sqrt(efficiency)
+
+    # Usable capacity (DoD)
+    usable_capacity = energies_kwh * (soc_max_pct - soc_min_pct) / 100.0
+
+    total_charge = np.zeros(len(energies_kwh))
+    total_discharge = np.zeros(len(energies_kwh))
+
+    if NUMBA_AVAILABLE:
+        # Compiled loop is fast enough to run each size separately
+        pv_arr = np.ascontiguousarray(pv_kwh, dtype=np.float64)
+        load_arr = np.ascontiguousarray(load_kwh, dtype=np.float64)
+        scratch = [np.empty(len(pv_arr)) for _ in range(3)]
+        for k in range(len(energies_kwh)):
+            total_charge[k], total_discharge[k] = bess_dispatch(
+                pv_arr, load_arr,
+                float(energies_kwh[k]), float(powers_kw[k]), float(one_way_eff),
+                float(soc_min_pct), float(soc_max_pct),
+                *scratch
+            )
+    else:
+        # Start at middle SoC
+        soc_pct = np.full(len(energies_kwh), (soc_min_pct + soc_max_pct) / 2.0)
+
+        # A full (or empty) battery gets zero available capacity (energy), so no
+        # per-size masks are needed for the SoC limits
+        for net in (pv_kwh - load_kwh).tolist():
+            if net > 0:
+                # Charge from surplus
+                available_capacity_kwh = (soc_max_pct - soc_pct) / 100.0 * energies_kwh
+                max_charge_from_surplus = np.minimum(powers_kw, net)
+                energy_to_store = np.minimum(max_charge_from_surplus * one_way_eff, available_capacity_kwh)
+                if one_way_eff > 0:
+                    total_charge += energy_to_store / one_way_eff
+                soc_pct += energy_to_store / energies_kwh * 100.0
+
+            elif net < 0:
+                # Discharge to cover deficit
+                if one_way_eff > 0:
+                    available_energy_kwh = (soc_pct - soc_min_pct) / 100.0 * energies_kwh
+                    energy_needed = np.minimum(powers_kw, -net)
+                    energy_from_battery = np.minimum(energy_needed / one_way_eff, available_energy_kwh)
+                    total_discharge += energy_from_battery * one_way_eff
+                    soc_pct -= energy_from_battery / energies_kwh * 100.0
+
+            else:
+                continue
+
+            # Ensure SoC bounds
+            np.clip(soc_pct, soc_min_pct, soc_max_pct, out=soc_pct)
+
+    # Calculate equivalent cycles based on discharge
+    annual_cycles = np.divide(
+        total_discharge, usable_capacity,
+        out=np.zeros(len(energies_kwh)), where=usable_capacity > 0
+    )
+
+    return {
+        'annual_charge_kwh': total_charge,
+        'annual_discharge_kwh': total_discharge,
+        'annual_cycles': annual_cycles
+    }
+
+
+def generate_pareto_frontier(
     pv_kwh: np.ndarray,
     load_kwh: np.ndarray,
     monthly_analysis: List[MonthlyAnalysis],
@@ -804,10 +1119,11 @@ async def generate_pareto_frontier(
 
     # NEW: Analyze hourly surplus distribution for better power sizing
     surplus_per_hour = np.maximum(pv_kwh - load_kwh, 0)
-    hours_with_surplus = np.sum(surplus_per_hour > 0)
-    avg_surplus_when_positive = np.mean(surplus_per_hour[surplus_per_hour > 0]) if hours_with_surplus > 0 else 0
+    positive_surplus = surplus_per_hour[surplus_per_hour > 0]
+    hours_with_surplus = positive_surplus.size
+    avg_surplus_when_positive = np.mean(positive_surplus) if hours_with_surplus > 0 else 0
     max_hourly_surplus = np.max(surplus_per_hour)
-    p95_hourly_surplus = np.percentile(surplus_per_hour[surplus_per_hour > 0], 95) if hours_with_surplus > 0 else 0
+    p95_hourly_surplus = np.percentile(positive_surplus, 95) if hours_with_surplus > 0 else 0
 
     print(f"📊 Pareto analysis inputs:")
     print(f"   Annual surplus: {annual_surplus_kwh/1000:.1f} MWh")
@@ -847,7 +1163,7 @@ async def generate_pareto_frontier(
 
     energy_range = np.linspace(min_energy, max_energy, n_points)
 
-    pareto_points = []
+    candidates = []
 
     for energy_kwh in energy_range:
         # Allow smaller BESS for small PV installations
@@ -873,22 +1189,30 @@ async def generate_pareto_frontier(
         # Take the higher of: power from duration OR power from surplus distribution
         power_kw = max(energy_kwh / duration, power_from_surplus * 0.8)
 
-        # ============================================
-        # USE REAL HOURLY SIMULATION (not statistical)
-        # ============================================
-        sim_result = simulate_bess_hourly(
-            pv_kwh=pv_kwh,
-            load_kwh=load_kwh,
-            bess_energy_kwh=energy_kwh,
-            bess_power_kw=power_kw,
-            efficiency=efficiency,
-            soc_min_pct=10.0,
-            soc_max_pct=90.0
-        )
+        candidates.append((energy_kwh, power_kw))
+
+    # ============================================
+    # USE REAL HOURLY SIMULATION (not statistical)
+    # All candidate sizes are simulated together in one hourly pass
+    # ============================================
+    sim_result = simulate_bess_batch(
+        pv_kwh=pv_kwh,
+        load_kwh=load_kwh,
+        energies_kwh=[energy_kwh for energy_kwh, _ in candidates],
+        powers_kw=[power_kw for _, power_kw in candidates],
+        efficiency=efficiency,
+        soc_min_pct=10.0,
+        soc_max_pct=90.0
+    )
 
-        annual_cycles = sim_result['annual_cycles']
-        annual_discharge = sim_result['annual_discharge_kwh']
+    pareto_points = []
 
+    for (energy_kwh, power_kw), annual_cycles, annual_discharge in zip(
+        candidates,
+        sim_result['annual_cycles'].tolist(),
+        sim_result['annual_discharge_kwh'].tolist(),
+        strict=True
+    ):
         # Calculate economics with degradation and auxiliary losses
         capex = power_kw * capex_per_kw + energy_kwh * capex_per_kwh
 
@@ -922,34 +1246,52 @@ async def generate_pareto_frontier(
             is_selected=False
         ))
 
-    # Mark Pareto-optimal points (non-dominated)
-    for i, p1 in enumerate(pareto_points):
-        is_dominated = False
-        for j, p2 in enumerate(pareto_points):
-            if i != j:
-                # p2 dominates p1 if better in both objectives
-                if p2.npv_mln_pln >= p1.npv_mln_pln and p2.annual_cycles >= p1.annual_cycles:
-                    if p2.npv_mln_pln > p1.npv_mln_pln or p2.annual_cycles > p1.annual_cycles:
-                        is_dominated = True
-                        break
-        if not is_dominated:
-            pareto_points[i].is_selected = True
+    mark_pareto_optimal(pareto_points)
 
     return pareto_points
 
 
+def mark_pareto_optimal(points: List[ParetoPoint]) -> None:
+    """Mark non-dominated points (higher NPV and more cycles are both better).
+
+    Sweep in order of falling NPV: a point is Pareto-optimal if it has the most
+    cycles among points with the same NPV and strictly more cycles than every
+    point with a higher NPV. O(n log n) instead of pairwise comparison.
+    """
+    best_cycles = float('-inf')
+    by_npv = sorted(points, key=lambda p: p.npv_mln_pln, reverse=True)
+    for _, group in groupby(by_npv, key=lambda p: p.npv_mln_pln):
+        group = list(group)
+        group_best = max(p.annual_cycles for p in group)
+        if group_best > best_cycles:
+            for p in group:
+                if p.annual_cycles == group_best:
+                    p.is_selected = True
+            best_cycles = group_best
+
+
+def strategy_candidates(
+    pareto_points: List[ParetoPoint]
+) -> Tuple[List[ParetoPoint], np.ndarray, np.ndarray]:
+    """Pareto-optimal points (all points if none) with their NPV and cycle arrays"""
+    optimal = [p for p in pareto_points if p.is_selected]
+    if not optimal:
+        optimal = pareto_points
+    npvs = np.array([p.npv_mln_pln for p in optimal], dtype=np.float64)
+    cycles = np.array([p.annual_cycles for p in optimal], dtype=np.float64)
+    return optimal, npvs, cycles
+
+
 def select_by_strategy(
     pareto_points: List[ParetoPoint],
     strategy: OptimizationStrategy,
     min_cycles: int,
-    max_cycles: int
+    max_cycles: int,
+    candidates: Optional[Tuple[List[ParetoPoint], np.ndarray, np.ndarray]] = None
 ) -> Optional[ParetoPoint]:
-    """Select best point based on strategy"""
+    """Select best point based on strategy (pass `candidates` to reuse arrays across strategies)"""
 
-    # Filter Pareto-optimal points
-    optimal = [p for p in pareto_points if p.is_selected]
-    if not optimal:
-        optimal = pareto_points
+    optimal, npvs, cycles = candidates or strategy_candidates(pareto_points)
 
     # Return None if no points available
     if not optimal:
@@ -957,20 +1299,20 @@ def select_by_strategy(
 
     if strategy == OptimizationStrategy.NPV_MAX:
         # Simply max NPV
-        return max(optimal, key=lambda p: p.npv_mln_pln)
+        return optimal[int(np.argmax(npvs))]
 
     elif strategy == OptimizationStrategy.CYCLES_MAX:
         # Max cycles (smaller battery)
-        return max(optimal, key=lambda p: p.annual_cycles)
+        return optimal[int(np.argmax(cycles))]
 
     else:  # BALANCED
         # Find point with best NPV within cycle constraints
-        filtered = [p for p in optimal if min_cycles <= p.annual_cycles <= max_cycles]
-        if filtered:
-            return max(filtered, key=lambda p: p.npv_mln_pln)
+        in_range = (cycles >= min_cycles) & (cycles <= max_cycles)
+        if in_range.any():
+            return optimal[int(np.argmax(np.where(in_range, npvs, -np.inf)))]
         # Fallback to closest to target range
         target = (min_cycles + max_cycles) / 2
-        return min(optimal, key=lambda p: abs(p.annual_cycles - target))
+        return optimal[int(np.argmin(np.abs(cycles - target)))]
 
 
 def calculate_bess_recommendations(
@@ -987,9 +1329,16 @@ def calculate_bess_recommendations(
     discount_rate: float,
     project_years: int,
     min_cycles: int,
-    max_cycles: int
+    max_cycles: int,
+    known_sims: Optional[Dict[Tuple[float, float], Dict]] = None
 ) -> List[BessSizingRecommendation]:
-    """Generate BESS sizing recommendations based on strategy using REAL hourly simulation."""
+    """
+    Generate BESS sizing recommendations based on strategy using REAL hourly simulation.
+
+    known_sims maps (energy_kwh, power_kw) to simulate_bess_hourly() results
+    (10-90% SoC window) already computed by the caller; the remaining sizes
+    are simulated together with simulate_bess_batch().
+    """
 
     recommendations = []
     total_annual_surplus = sum(m.total_surplus_mwh for m in monthly_analysis) * 1000
@@ -1001,8 +1350,36 @@ def calculate_bess_recommendations(
         (OptimizationStrategy.BALANCED, "🎯 Zbalansowany"),
     ]
 
-    for strat, name in strategies_to_show:
-        selected = select_by_strategy(pareto_points, strat, min_cycles, max_cycles)
+    candidates = strategy_candidates(pareto_points)
+    selections = [
+        (strat, name, select_by_strategy(pareto_points, strat, min_cycles, max_cycles, candidates))
+        for strat, name in strategies_to_show
+    ]
+
+    # ============================================
+    # USE REAL HOURLY SIMULATION (not statistical)
+    # Strategies often pick the same size - simulate each distinct size once
+    # ============================================
+    sims = dict(known_sims or {})
+    missing = list(dict.fromkeys(
+        (selected.energy_kwh, selected.power_kw)
+        for _, _, selected in selections
+        if selected and (selected.energy_kwh, selected.power_kw) not in sims
+    ))
+    if missing:
+        batch = simulate_bess_batch(
+            pv_kwh=pv_kwh,
+            load_kwh=load_kwh,
+            energies_kwh=[energy for energy, _ in missing],
+            powers_kw=[power for _, power in missing],
+            efficiency=bess_efficiency,
+            soc_min_pct=10.0,
+            soc_max_pct=90.0
+        )
+        for i, key in enumerate(missing):
+            sims[key] = {field: float(values[i]) for field, values in batch.items()}
+
+    for strat, name, selected in selections:
         if not selected:
             continue
 
@@ -1011,18 +1388,7 @@ def calculate_bess_recommendations(
         duration = energy / power if power > 0 else 2
         usable = energy * 0.8
 
-        # ============================================
-        # USE REAL HOURLY SIMULATION (not statistical)
-        # ============================================
-        sim_result = simulate_bess_hourly(
-            pv_kwh=pv_kwh,
-            load_kwh=load_kwh,
-            bess_energy_kwh=energy,
-            bess_power_kw=power,
-            efficiency=bess_efficiency,
-            soc_min_pct=10.0,
-            soc_max_pct=90.0
-        )
+        sim_result = sims[(energy, power)]
 
         annual_cycles = sim_result['annual_cycles']
         annual_discharge = sim_result['annual_discharge_kwh']
@@ -1135,6 +1501,7 @@ def calculate_pv_recommendations(
         return recommendations
 
     usable_bess = bess_energy_kwh * 0.8
+    sqrt_eff = float(np.sqrt(bess_efficiency))
 
     low_util_months = [m for m in monthly_analysis
                        if m.current_bess_cycles and m.current_bess_cycles < m.days * 0.5]
@@ -1148,7 +1515,7 @@ def calculate_pv_recommendations(
         for m in low_util_months:
             current_surplus = m.avg_daily_surplus_kwh
             new_surplus = current_surplus * ratio
-            new_daily_charge = min(new_surplus * np.sqrt(bess_efficiency), usable_bess)
+            new_daily_charge = min(new_surplus * sqrt_eff, usable_bess)
             new_cycles = new_daily_charge / usable_bess * m.days
             current_cycles = m.current_bess_cycles or 0
             additional_cycles += max(0, new_cycles - current_cycles)
@@ -1247,86 +1614,72 @@ def generate_insights(
     return insights
 
 
-# ============== API Endpoints ==============
-
-@app.get("/health")
-async def health_check():
-    return {
-        "status": "healthy",
-        "service": "profile-analysis",
-        "version": "2.0.0",
-        "features": ["pareto", "strategies", "heatmap", "comparison"]
-    }
-
-
-@app.post("/analyze", response_model=ProfileAnalysisResult)
-async def analyze_profile(request: ProfileAnalysisRequest):
+def run_profile_analysis(request: ProfileAnalysisRequest) -> ProfileAnalysisResult:
     """
-    Perform comprehensive profile analysis v2.0
+    Run the complete profile analysis for /analyze.
 
-    Features:
-    - Three optimization strategies (NPV Max, Cycles Max, Balanced)
-    - Pareto frontier visualization
-    - 24h x 12 month heatmap
-    - Variant comparison
+    Pure CPU-bound NumPy work without I/O - the endpoint runs it via
+    asyncio.to_thread so the event loop keeps serving other requests.
     """
+    pv_arr = profile_array(request.pv_generation_kwh, request.pv_generation_b64, "pv_generation")
+    load_arr = profile_array(request.load_kwh, request.load_b64, "load")
+    n_pv = len(pv_arr)
+    n_load = len(load_arr)
 
-    try:
-        n_pv = len(request.pv_generation_kwh)
-        n_load = len(request.load_kwh)
+    print(f"📊 Profile analysis v2.0: PV={n_pv}, Load={n_load}, Strategy={request.strategy.value}")
 
-        print(f"📊 Profile analysis v2.0: PV={n_pv}, Load={n_load}, Strategy={request.strategy.value}")
+    # Handle mismatched lengths
 
-        # Handle mismatched lengths
-        pv_arr = np.array(request.pv_generation_kwh)
-        load_arr = np.array(request.load_kwh)
-
-        if n_pv == 8760 or n_load == 8760:
+    if n_pv == 8760 or n_load == 8760:
+        target_n = 8760
+        hours_per_step = 1.0
+    elif n_pv == 35040 or n_load == 35040:
+        target_n = 35040
+        hours_per_step = 0.25
+    else:
+        target_n = min(n_pv, n_load)
+        if target_n > 8760:
             target_n = 8760
-            hours_per_step = 1.0
-        elif n_pv == 35040 or n_load == 35040:
-            target_n = 35040
-            hours_per_step = 0.25
-        else:
-            target_n = min(n_pv, n_load)
-            if target_n > 8760:
-                target_n = 8760
-            hours_per_step = 1.0
-            print(f"⚠️ Non-standard lengths, using {target_n} timesteps")
-
-        # Resample arrays
-        if n_pv != target_n:
-            x_old = np.linspace(0, 1, n_pv)
-            x_new = np.linspace(0, 1, target_n)
-            pv_arr = np.interp(x_new, x_old, pv_arr)
-            print(f"  → PV resampled from {n_pv} to {target_n}")
-
-        if n_load != target_n:
-            x_old = np.linspace(0, 1, n_load)
-            x_new = np.linspace(0, 1, target_n)
-            load_arr = np.interp(x_new, x_old, load_arr)
-            print(f"  → Load resampled from {n_load} to {target_n}")
-
-        pv_kwh = pv_arr
-        load_kwh = load_arr
-
-        # Basic calculations
-        surplus = np.maximum(pv_kwh - load_kwh, 0)
-        deficit = np.maximum(load_kwh - pv_kwh, 0)
-        direct = np.minimum(pv_kwh, load_kwh)
-
-        annual_pv = np.sum(pv_kwh) * hours_per_step / 1000
-        annual_load = np.sum(load_kwh) * hours_per_step / 1000
-        annual_surplus = np.sum(surplus) * hours_per_step / 1000
-        annual_deficit = np.sum(deficit) * hours_per_step / 1000
-        annual_direct = np.sum(direct) * hours_per_step / 1000
-
-        print(f"📊 Energy balance:")
-        print(f"   Annual PV: {annual_pv:.1f} MWh")
-        print(f"   Annual Load: {annual_load:.1f} MWh")
-        print(f"   Annual Direct (PV self-consumed): {annual_direct:.1f} MWh")
-        print(f"   Annual Surplus (PV exported): {annual_surplus:.1f} MWh")
-
+        hours_per_step = 1.0
+        print(f"⚠️ Non-standard lengths, using {target_n} timesteps")
+
+    # Resample arrays
+    if n_pv != target_n:
+        pv_arr = resample_profile(pv_arr, target_n)
+        print(f"  → PV resampled from {n_pv} to {target_n}")
+
+    if n_load != target_n:
+        load_arr = resample_profile(load_arr, target_n)
+        print(f"  → Load resampled from {n_load} to {target_n}")
+
+    pv_kwh = pv_arr
+    load_kwh = load_arr
+
+    # Basic calculations - only the surplus needs a full pass of its own:
+    # deficit = surplus - (pv - load) and direct = min(pv, load) = pv - surplus
+    total_pv = np.sum(pv_kwh)
+    total_load = np.sum(load_kwh)
+    total_surplus = np.sum(np.maximum(pv_kwh - load_kwh, 0))
+
+    annual_pv = total_pv * hours_per_step / 1000
+    annual_load = total_load * hours_per_step / 1000
+    annual_surplus = total_surplus * hours_per_step / 1000
+    # Derived totals can land a rounding error below zero (e.g. PV >= load in every step)
+    annual_deficit = max((total_surplus - total_pv + total_load) * hours_per_step / 1000, 0.0)
+    annual_direct = max((total_pv - total_surplus) * hours_per_step / 1000, 0.0)
+
+    print(f"📊 Energy balance:")
+    print(f"   Annual PV: {annual_pv:.1f} MWh")
+    print(f"   Annual Load: {annual_load:.1f} MWh")
+    print(f"   Annual Direct (PV self-consumed): {annual_direct:.1f} MWh")
+    print(f"   Annual Surplus (PV exported): {annual_surplus:.1f} MWh")
+
+    # Strategy-independent stages are memoized by profile content + parameters
+    fingerprint = profile_fingerprint(pv_kwh, load_kwh, request.timestamps)
+    profile_key = ("profile", fingerprint, hours_per_step, request.bess_energy_kwh, request.bess_efficiency)
+    cached_profile = analysis_cache.get(profile_key)
+
+    if cached_profile is None:
         # Hourly patterns
         hourly_patterns = analyze_hourly_patterns(pv_kwh, load_kwh, hours_per_step)
 
@@ -1342,68 +1695,94 @@ async def analyze_profile(request: ProfileAnalysisRequest):
             timestamps=request.timestamps
         )
 
-        # Quarterly summary - surplus from monthly analysis (this is correct)
-        quarterly_surplus = {}
-        for q_name, months in [("Q1", [1,2,3]), ("Q2", [4,5,6]), ("Q3", [7,8,9]), ("Q4", [10,11,12])]:
-            q_months = [m for m in monthly_analysis if m.month in months]
-            quarterly_surplus[q_name] = sum(m.total_surplus_mwh for m in q_months)
-
-        # quarterly_cycles will be calculated later from real hourly simulation
-        quarterly_cycles = {"Q1": 0, "Q2": 0, "Q3": 0, "Q4": 0}
-
-        # Current BESS performance - using REAL hourly simulation
-        current_annual_cycles = None
-        current_utilization = None
-        current_curtailment_ratio = None
-        current_annual_discharge_mwh = None
-
-        # Hourly BESS data for Excel export (single source of truth)
-        hourly_bess_charge = None
-        hourly_bess_discharge = None
-        hourly_bess_soc = None
-
-        if request.bess_energy_kwh and request.bess_energy_kwh > 0:
-            # Use real hourly simulation instead of statistical estimation
-            current_bess_sim = simulate_bess_hourly(
-                pv_kwh=pv_kwh,
-                load_kwh=load_kwh,
-                bess_energy_kwh=request.bess_energy_kwh,
-                bess_power_kw=request.bess_power_kw,
-                efficiency=request.bess_efficiency
-            )
-            current_annual_cycles = current_bess_sim['annual_cycles']
-            current_annual_discharge_mwh = current_bess_sim['annual_discharge_kwh'] / 1000
-            current_utilization = current_annual_cycles / 365 * 100
-
-            # Store hourly data for Excel export (single source of truth!)
-            # Round to 2 decimals to reduce JSON size
-            hourly_bess_charge = [round(x, 2) for x in current_bess_sim['hourly_charge'].tolist()]
-            hourly_bess_discharge = [round(x, 2) for x in current_bess_sim['hourly_discharge'].tolist()]
-            hourly_bess_soc = [round(x, 1) for x in current_bess_sim['hourly_soc'].tolist()]
-
-            if annual_surplus > 0:
-                current_curtailment_ratio = 1 - (current_annual_discharge_mwh / annual_surplus)
-
-            # Calculate quarterly cycles from hourly simulation data
-            hourly_discharge = current_bess_sim['hourly_discharge']
-            usable_capacity = request.bess_energy_kwh * 0.8  # 80% DoD
-
-            # Quarter definitions (hour ranges for 8760 hours)
-            # Q1: Jan-Mar (hours 0-2159), Q2: Apr-Jun (2160-4343), Q3: Jul-Sep (4344-6551), Q4: Oct-Dec (6552-8759)
-            # Using approximate hours per quarter (31+28+31=90, 30+31+30=91, 31+31+30=92, 31+30+31=92 days)
-            q_hours = {
-                "Q1": (0, 90*24),           # Jan-Mar
-                "Q2": (90*24, 181*24),      # Apr-Jun
-                "Q3": (181*24, 273*24),     # Jul-Sep
-                "Q4": (273*24, 365*24)      # Oct-Dec
-            }
-            for q_name, (start_h, end_h) in q_hours.items():
-                end_h = min(end_h, len(hourly_discharge))
-                q_discharge = np.sum(hourly_discharge[start_h:end_h])
-                quarterly_cycles[q_name] = q_discharge / usable_capacity if usable_capacity > 0 else 0
+        analysis_cache.set(profile_key, (hourly_patterns, heatmap_data, monthly_analysis))
+    else:
+        hourly_patterns, heatmap_data, monthly_analysis = cached_profile
+        print("  → Patterns, heatmap and monthly analysis served from cache")
+
+    # Quarterly summary - surplus from monthly analysis (this is correct)
+    # Months missing from the profile stay at zero
+    surplus_by_month = np.zeros(12)
+    for m in monthly_analysis:
+        surplus_by_month[m.month - 1] += m.total_surplus_mwh
+    quarterly_surplus = dict(zip(
+        ("Q1", "Q2", "Q3", "Q4"),
+        surplus_by_month.reshape(4, 3).sum(axis=1).tolist(),
+        strict=True
+    ))
+
+    # quarterly_cycles will be calculated later from real hourly simulation
+    quarterly_cycles = {"Q1": 0, "Q2": 0, "Q3": 0, "Q4": 0}
+
+    # Current BESS performance - using REAL hourly simulation
+    current_annual_cycles = None
+    current_utilization = None
+    current_curtailment_ratio = None
+    current_annual_discharge_mwh = None
+    current_bess_sim = None
+
+    # Hourly BESS data for Excel export (single source of truth)
+    hourly_bess_charge = None
+    hourly_bess_discharge = None
+    hourly_bess_soc = None
+
+    if request.bess_energy_kwh and request.bess_energy_kwh > 0:
+        # Use real hourly simulation instead of statistical estimation
+        current_bess_sim = simulate_bess_hourly(
+            pv_kwh=pv_kwh,
+            load_kwh=load_kwh,
+            bess_energy_kwh=request.bess_energy_kwh,
+            bess_power_kw=request.bess_power_kw,
+            efficiency=request.bess_efficiency
+        )
+        current_annual_cycles = current_bess_sim['annual_cycles']
+        current_annual_discharge_mwh = current_bess_sim['annual_discharge_kwh'] / 1000
+        current_utilization = current_annual_cycles / 365 * 100
+
+        # Store hourly data for Excel export (single source of truth!)
+        # Round to 2 decimals to reduce JSON size
+        hourly_bess_charge = rounded_list(current_bess_sim['hourly_charge'], 2)
+        hourly_bess_discharge = rounded_list(current_bess_sim['hourly_discharge'], 2)
+        hourly_bess_soc = rounded_list(current_bess_sim['hourly_soc'], 1)
+
+        if annual_surplus > 0:
+            current_curtailment_ratio = 1 - (current_annual_discharge_mwh / annual_surplus)
+
+        # Calculate quarterly cycles from hourly simulation data
+        hourly_discharge = current_bess_sim['hourly_discharge']
+        usable_capacity = request.bess_energy_kwh * 0.8  # 80% DoD
+
+        # Quarter definitions (hour ranges for 8760 hours)
+        # Q1: Jan-Mar (hours 0-2159), Q2: Apr-Jun (2160-4343), Q3: Jul-Sep (4344-6551), Q4: Oct-Dec (6552-8759)
+        # Using approximate hours per quarter (31+28+31=90, 30+31+30=91, 31+31+30=92, 31+30+31=92 days)
+        q_hours = {
+            "Q1": (0, 90*24),           # Jan-Mar
+            "Q2": (90*24, 181*24),      # Apr-Jun
+            "Q3": (181*24, 273*24),     # Jul-Sep
+            "Q4": (273*24, 365*24)      # Oct-Dec
+        }
+        for q_name, (start_h, end_h) in q_hours.items():
+            end_h = min(end_h, len(hourly_discharge))
+            q_discharge = np.sum(hourly_discharge[start_h:end_h])
+            quarterly_cycles[q_name] = q_discharge / usable_capacity if usable_capacity > 0 else 0
+
+    # Generate Pareto frontier (independent of strategy and cycle range - memoized)
+    pareto_key = profile_key + (
+        "pareto",
+        request.pv_capacity_kwp,
+        request.energy_price_plnmwh,
+        request.bess_capex_per_kwh,
+        request.bess_capex_per_kw,
+        request.discount_rate,
+        request.project_years,
+        request.pareto_points,
+        request.bess_degradation_pct_per_year,
+        request.bess_auxiliary_loss_pct_per_day
+    )
+    pareto_frontier = analysis_cache.get(pareto_key)
 
-        # Generate Pareto frontier
-        pareto_frontier = await generate_pareto_frontier(
+    if pareto_frontier is None:
+        pareto_frontier = generate_pareto_frontier(
             pv_kwh, load_kwh,
             monthly_analysis,
             request.pv_capacity_kwp,
@@ -1417,146 +1796,198 @@ async def analyze_profile(request: ProfileAnalysisRequest):
             request.bess_degradation_pct_per_year,
             request.bess_auxiliary_loss_pct_per_day
         )
+        analysis_cache.set(pareto_key, pareto_frontier)
+    else:
+        print("  → Pareto frontier served from cache")
+
+    # ============================================================
+    # SIMULATE RECOMMENDED BESS (Best NPV from Pareto)
+    # This is the SINGLE SOURCE OF TRUTH for EKONOMIA and Excel!
+    # ============================================================
+    recommended_bess_power_kw = None
+    recommended_bess_energy_kwh = None
+    recommended_bess_annual_cycles = None
+    recommended_bess_annual_discharge_mwh = None
+    recommended_hourly_charge = None
+    recommended_hourly_discharge = None
+    recommended_hourly_soc = None
+
+    # Hourly simulations already run in this request, reused by the recommendations
+    known_sims = {}
+    if current_bess_sim is not None:
+        known_sims[(request.bess_energy_kwh, request.bess_power_kw)] = current_bess_sim
+
+    if pareto_frontier:
+        # Find Best NPV point from Pareto frontier
+        best_npv_point = max(pareto_frontier, key=lambda p: p.npv_mln_pln)
+        print(f"📊 Best NPV from Pareto: {best_npv_point.npv_mln_pln:.2f} mln PLN, "
+              f"{best_npv_point.power_kw:.0f} kW / {best_npv_point.energy_kwh:.0f} kWh")
+
+        # Run hourly simulation for recommended BESS
+        recommended_sim = simulate_bess_hourly(
+            pv_kwh=pv_kwh,
+            load_kwh=load_kwh,
+            bess_energy_kwh=best_npv_point.energy_kwh,
+            bess_power_kw=best_npv_point.power_kw,
+            efficiency=request.bess_efficiency
+        )
+        known_sims[(best_npv_point.energy_kwh, best_npv_point.power_kw)] = recommended_sim
+
+        recommended_bess_power_kw = best_npv_point.power_kw
+        recommended_bess_energy_kwh = best_npv_point.energy_kwh
+        recommended_bess_annual_cycles = recommended_sim['annual_cycles']
+        recommended_bess_annual_discharge_mwh = recommended_sim['annual_discharge_kwh'] / 1000
+
+        # Store hourly data for Excel export (rounded to reduce JSON size)
+        recommended_hourly_charge = rounded_list(recommended_sim['hourly_charge'], 2)
+        recommended_hourly_discharge = rounded_list(recommended_sim['hourly_discharge'], 2)
+        recommended_hourly_soc = rounded_list(recommended_sim['hourly_soc'], 1)
+
+        print(f"✅ Recommended BESS simulation: {recommended_bess_annual_discharge_mwh:.2f} MWh/year, "
+              f"{recommended_bess_annual_cycles:.1f} cycles")
+
+    # Generate recommendations based on strategy (using hourly simulation)
+    bess_recommendations = calculate_bess_recommendations(
+        pv_kwh,
+        load_kwh,
+        monthly_analysis,
+        pareto_frontier,
+        request.strategy,
+        request.pv_capacity_kwp,
+        request.energy_price_plnmwh,
+        request.bess_capex_per_kwh,
+        request.bess_capex_per_kw,
+        request.bess_efficiency,
+        request.discount_rate,
+        request.project_years,
+        request.min_cycles_per_year,
+        request.max_cycles_per_year,
+        known_sims=known_sims
+    )
 
-        # ============================================================
-        # SIMULATE RECOMMENDED BESS (Best NPV from Pareto)
-        # This is the SINGLE SOURCE OF TRUTH for EKONOMIA and Excel!
-        # ============================================================
-        recommended_bess_power_kw = None
-        recommended_bess_energy_kwh = None
-        recommended_bess_annual_cycles = None
-        recommended_bess_annual_discharge_mwh = None
-        recommended_hourly_charge = None
-        recommended_hourly_discharge = None
-        recommended_hourly_soc = None
-
-        if pareto_frontier:
-            # Find Best NPV point from Pareto frontier
-            best_npv_point = max(pareto_frontier, key=lambda p: p.npv_mln_pln)
-            print(f"📊 Best NPV from Pareto: {best_npv_point.npv_mln_pln:.2f} mln PLN, "
-                  f"{best_npv_point.power_kw:.0f} kW / {best_npv_point.energy_kwh:.0f} kWh")
-
-            # Run hourly simulation for recommended BESS
-            recommended_sim = simulate_bess_hourly(
-                pv_kwh=pv_kwh,
-                load_kwh=load_kwh,
-                bess_energy_kwh=best_npv_point.energy_kwh,
-                bess_power_kw=best_npv_point.power_kw,
-                efficiency=request.bess_efficiency
-            )
+    # Generate variant comparison
+    variant_comparison = generate_variant_comparison(
+        bess_recommendations,
+        annual_surplus,
+        annual_deficit,
+        annual_pv,
+        annual_load,
+        request.energy_price_plnmwh,
+        request.project_years
+    )
 
-            recommended_bess_power_kw = best_npv_point.power_kw
-            recommended_bess_energy_kwh = best_npv_point.energy_kwh
-            recommended_bess_annual_cycles = recommended_sim['annual_cycles']
-            recommended_bess_annual_discharge_mwh = recommended_sim['annual_discharge_kwh'] / 1000
+    # PV recommendations
+    pv_recommendations = calculate_pv_recommendations(
+        monthly_analysis,
+        request.pv_capacity_kwp,
+        request.bess_energy_kwh,
+        request.bess_efficiency,
+        request.energy_price_plnmwh
+    )
 
-            # Store hourly data for Excel export (rounded to reduce JSON size)
-            recommended_hourly_charge = [round(x, 2) for x in recommended_sim['hourly_charge'].tolist()]
-            recommended_hourly_discharge = [round(x, 2) for x in recommended_sim['hourly_discharge'].tolist()]
-            recommended_hourly_soc = [round(x, 1) for x in recommended_sim['hourly_soc'].tolist()]
+    # Generate insights
+    insights = generate_insights(
+        monthly_analysis,
+        quarterly_cycles,
+        request.bess_energy_kwh,
+        annual_surplus,
+        annual_deficit,
+        request.strategy,
+        bess_recommendations
+    )
 
-            print(f"✅ Recommended BESS simulation: {recommended_bess_annual_discharge_mwh:.2f} MWh/year, "
-                  f"{recommended_bess_annual_cycles:.1f} cycles")
+    print(f"✓ Analysis complete: {len(pareto_frontier)} Pareto points, {len(bess_recommendations)} recommendations")
+
+    # Everything below is already typed (sub-models were validated when built),
+    # so skip re-validating the ~60k hourly floats
+    return ProfileAnalysisResult.model_construct(
+        annual_pv_mwh=round(annual_pv, 2),
+        annual_load_mwh=round(annual_load, 2),
+        annual_surplus_mwh=round(annual_surplus, 2),
+        annual_deficit_mwh=round(annual_deficit, 2),
+        direct_consumption_mwh=round(annual_direct, 2),
+        direct_consumption_pct=round(annual_direct / annual_pv * 100, 1) if annual_pv > 0 else 0,
+        hourly_patterns=hourly_patterns,
+        heatmap_data=heatmap_data,
+        monthly_analysis=monthly_analysis,
+        quarterly_cycles=quarterly_cycles,
+        quarterly_surplus_mwh=quarterly_surplus,
+        current_bess_annual_cycles=round(current_annual_cycles, 1) if current_annual_cycles else None,
+        current_bess_annual_discharge_mwh=round(current_annual_discharge_mwh, 2) if current_annual_discharge_mwh else None,
+        current_bess_utilization_pct=round(current_utilization, 1) if current_utilization else None,
+        current_curtailment_ratio=round(current_curtailment_ratio, 2) if current_curtailment_ratio else None,
+        # Hourly BESS data for FORM BESS (from request parameters)
+        hourly_bess_charge=hourly_bess_charge,
+        hourly_bess_discharge=hourly_bess_discharge,
+        hourly_bess_soc=hourly_bess_soc,
+        # RECOMMENDED BESS data (Best NPV from Pareto) - SINGLE SOURCE OF TRUTH!
+        recommended_bess_power_kw=round(recommended_bess_power_kw, 0) if recommended_bess_power_kw else None,
+        recommended_bess_energy_kwh=round(recommended_bess_energy_kwh, 0) if recommended_bess_energy_kwh else None,
+        recommended_bess_annual_cycles=round(recommended_bess_annual_cycles, 1) if recommended_bess_annual_cycles else None,
+        recommended_bess_annual_discharge_mwh=round(recommended_bess_annual_discharge_mwh, 3) if recommended_bess_annual_discharge_mwh else None,
+        recommended_hourly_bess_charge=recommended_hourly_charge,
+        recommended_hourly_bess_discharge=recommended_hourly_discharge,
+        recommended_hourly_bess_soc=recommended_hourly_soc,
+        # Degradation and auxiliary parameters
+        bess_degradation_pct_per_year=request.bess_degradation_pct_per_year,
+        bess_auxiliary_loss_pct_per_day=request.bess_auxiliary_loss_pct_per_day,
+        bess_capacity_at_project_end_pct=round(100 - request.bess_degradation_pct_per_year * request.project_years, 1),
+        selected_strategy=request.strategy.value,
+        bess_recommendations=bess_recommendations,
+        pareto_frontier=pareto_frontier,
+        variant_comparison=variant_comparison,
+        pv_recommendations=pv_recommendations,
+        insights=insights,
+        # Hourly PV and Load data for Excel export
+        hourly_pv_kwh=rounded_list(pv_kwh, 2),
+        hourly_load_kwh=rounded_list(load_kwh, 2)
+    )
 
-        # Generate recommendations based on strategy (using hourly simulation)
-        bess_recommendations = calculate_bess_recommendations(
-            pv_kwh,
-            load_kwh,
-            monthly_analysis,
-            pareto_frontier,
-            request.strategy,
-            request.pv_capacity_kwp,
-            request.energy_price_plnmwh,
-            request.bess_capex_per_kwh,
-            request.bess_capex_per_kw,
-            request.bess_efficiency,
-            request.discount_rate,
-            request.project_years,
-            request.min_cycles_per_year,
-            request.max_cycles_per_year
-        )
 
-        # Generate variant comparison
-        variant_comparison = generate_variant_comparison(
-            bess_recommendations,
-            annual_surplus,
-            annual_deficit,
-            annual_pv,
-            annual_load,
-            request.energy_price_plnmwh,
-            request.project_years
-        )
+# ============== API Endpoints ==============
 
-        # PV recommendations
-        pv_recommendations = calculate_pv_recommendations(
-            monthly_analysis,
-            request.pv_capacity_kwp,
-            request.bess_energy_kwh,
-            request.bess_efficiency,
-            request.energy_price_plnmwh
-        )
+@app.on_event("startup")
+async def warm_up_kernels():
+    """Load/compile the Numba dispatch kernel before the first /analyze request."""
+    if not NUMBA_AVAILABLE:
+        return
+    pv = np.ones(24)
+    load = np.zeros(24)
+    await asyncio.to_thread(simulate_bess_hourly, pv, load, 10.0, 5.0, 0.9)
+    print("✓ BESS dispatch kernel ready")
 
-        # Generate insights
-        insights = generate_insights(
-            monthly_analysis,
-            quarterly_cycles,
-            request.bess_energy_kwh,
-            annual_surplus,
-            annual_deficit,
-            request.strategy,
-            bess_recommendations
-        )
 
-        print(f"✓ Analysis complete: {len(pareto_frontier)} Pareto points, {len(bess_recommendations)} recommendations")
-
-        return ProfileAnalysisResult(
-            annual_pv_mwh=round(annual_pv, 2),
-            annual_load_mwh=round(annual_load, 2),
-            annual_surplus_mwh=round(annual_surplus, 2),
-            annual_deficit_mwh=round(annual_deficit, 2),
-            direct_consumption_mwh=round(annual_direct, 2),
-            direct_consumption_pct=round(annual_direct / annual_pv * 100, 1) if annual_pv > 0 else 0,
-            hourly_patterns=hourly_patterns,
-            heatmap_data=heatmap_data,
-            monthly_analysis=monthly_analysis,
-            quarterly_cycles=quarterly_cycles,
-            quarterly_surplus_mwh=quarterly_surplus,
-            current_bess_annual_cycles=round(current_annual_cycles, 1) if current_annual_cycles else None,
-            current_bess_annual_discharge_mwh=round(current_annual_discharge_mwh, 2) if current_annual_discharge_mwh else None,
-            current_bess_utilization_pct=round(current_utilization, 1) if current_utilization else None,
-            current_curtailment_ratio=round(current_curtailment_ratio, 2) if current_curtailment_ratio else None,
-            # Hourly BESS data for FORM BESS (from request parameters)
-            hourly_bess_charge=hourly_bess_charge,
-            hourly_bess_discharge=hourly_bess_discharge,
-            hourly_bess_soc=hourly_bess_soc,
-            # RECOMMENDED BESS data (Best NPV from Pareto) - SINGLE SOURCE OF TRUTH!
-            recommended_bess_power_kw=round(recommended_bess_power_kw, 0) if recommended_bess_power_kw else None,
-            recommended_bess_energy_kwh=round(recommended_bess_energy_kwh, 0) if recommended_bess_energy_kwh else None,
-            recommended_bess_annual_cycles=round(recommended_bess_annual_cycles, 1) if recommended_bess_annual_cycles else None,
-            recommended_bess_annual_discharge_mwh=round(recommended_bess_annual_discharge_mwh, 3) if recommended_bess_annual_discharge_mwh else None,
-            recommended_hourly_bess_charge=recommended_hourly_charge,
-            recommended_hourly_bess_discharge=recommended_hourly_discharge,
-            recommended_hourly_bess_soc=recommended_hourly_soc,
-            # Degradation and auxiliary parameters
-            bess_degradation_pct_per_year=request.bess_degradation_pct_per_year,
-            bess_auxiliary_loss_pct_per_day=request.bess_auxiliary_loss_pct_per_day,
-            bess_capacity_at_project_end_pct=round(100 - request.bess_degradation_pct_per_year * request.project_years, 1),
-            selected_strategy=request.strategy.value,
-            bess_recommendations=bess_recommendations,
-            pareto_frontier=pareto_frontier,
-            variant_comparison=variant_comparison,
-            pv_recommendations=pv_recommendations,
-            insights=insights,
-            # Hourly PV and Load data for Excel export
-            hourly_pv_kwh=[round(x, 2) for x in pv_kwh.tolist()],
-            hourly_load_kwh=[round(x, 2) for x in load_kwh.tolist()]
-        )
+@app.get("/health")
+async def health_check():
+    return {
+        "status": "healthy",
+        "service": "profile-analysis",
+        "version": "2.0.0",
+        "features": ["pareto", "strategies", "heatmap", "comparison"],
+        "cache": analysis_cache.stats()
+    }
+
+
+@app.post("/analyze", response_model=ProfileAnalysisResult)
+async def analyze_profile(request: ProfileAnalysisRequest):
+    """
+    Perform comprehensive profile analysis v2.0
+
+    Features:
+    - Three optimization strategies (NPV Max, Cycles Max, Balanced)
+    - Pareto frontier visualization
+    - 24h x 12 month heatmap
+    - Variant comparison
+    """
+
+    try:
+        result = await asyncio.to_thread(run_profile_analysis, request)
+        return ORJSONResponse(result.model_dump())
 
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Analysis failed")
         raise HTTPException(500, f"Analysis failed: {str(e)}")
 
 